@@ -0,0 +1,56 @@
+import logging
+from normalize import normalize_text
+
+def account_key(business):
+    # Trimmed, case-folded (Client, City); every account sharing it gets the same lookup result
+    return normalize_text(business.get('Client', '')), normalize_text(business.get('City', ''))
+
+class DuplicateIndex:
+    """Sends each distinct (Client, City) to the scraper once and fans the result out to every matching row.
+
+    Rows stay in input order and are processed lazily: unique_queries() feeds the scraper,
+    and resolve() pairs each row with the result of the first row that had its key.
+    """
+
+    def __init__(self):
+        self.queried = set()
+        self.results = {}
+        self.rows = 0
+        self.lookups_saved = 0
+
+    def unique_queries(self, businesses):
+        for business in businesses:
+            key = account_key(business)
+            if key not in self.queried:
+                self.queried.add(key)
+                yield business.get('Client', 'Unknown'), business.get('City', 'Unknown')
+
+    def resolve(self, business, results):
+        # `results` yields scraper results in the same order as unique_queries() produced queries;
+        # a failed lookup comes through as its exception and is raised for every row that shares it
+        self.rows += 1
+        key = account_key(business)
+        if key in self.results:
+            self.lookups_saved += 1
+            account_data = self.results[key]
+            if isinstance(account_data, Exception):
+                raise account_data
+            return dict(account_data) if account_data else account_data
+        account_data = self.results[key] = next(results)
+        if isinstance(account_data, Exception):
+            raise account_data
+        return account_data
+
+    def summary(self):
+        unique = len(self.results)
+        return f"{self.rows} accounts, {unique} unique business/city lookups, {self.lookups_saved} lookups saved by de-duplication"
+
+def summarize_duplicates(businesses):
+    # Offline report for an account list: how many lookups a run would save
+    groups = {}
+    for business in businesses:
+        groups.setdefault(account_key(business), []).append(business.get('Account #', ''))
+    duplicates = {key: accounts for key, accounts in groups.items() if len(accounts) > 1}
+    saved = sum(len(accounts) - 1 for accounts in duplicates.values())
+    logging.info(f"{sum(len(accounts) for accounts in groups.values())} accounts, {len(groups)} unique keys, {saved} duplicate lookups")
+    return duplicates, saved
@@ -0,0 +1,128 @@
+import csv
+import logging
+import os
+import re
+import threading
+from normalize import normalize_text
+from instrumentation import count
+
+# Conservative ZIP -> city/county table for the routes we serve; replace the file (same zip,city,county header)
+# to cover other areas. ZIPs shared by several towns are left out rather than guessed.
+DEFAULT_ZIP_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zip_codes.csv")
+CACHE_LIMIT = 100000
+
+US_STATES = {
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'DC', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA',
+    'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR',
+    'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY',
+}
+
+# Line breaks (the site renders the address with <br>) and stray commas all become single ", " separators
+SEPARATORS = re.compile(r'\s*(?:[\r\n]+|,)\s*(?:,\s*)*')
+ZIP_TAIL = re.compile(r'[\s,]*\b(\d{5})(?:-\d{4})?$')
+STATE_TAIL = re.compile(r'(,?)\s*\b([A-Za-z]{2})\.?$')
+# A segment that continues the street rather than naming the city: "STE 4", "#B", "UNIT 12"
+UNIT_SEGMENT = re.compile(r'^(?:#|(?:STE|SUITE|UNIT|APT|BLDG|SPC|SPACE|FL|FLOOR|RM|ROOM|NO)\b\.?)', re.IGNORECASE)
+
+def load_zip_table(path=DEFAULT_ZIP_TABLE):
+    # ZIP -> (city, county); a missing file just means nothing gets filled in
+    table = {}
+    if not path or not os.path.exists(path):
+        logging.warning(f"ZIP table {path} not found, addresses are parsed without it")
+        return table
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            zip_code = (row.get('zip') or '').strip()[:5]
+            if zip_code:
+                table[zip_code] = ((row.get('city') or '').strip().upper(), (row.get('county') or '').strip().upper())
+    return table
+
+class AddressNormalizer:
+    """Splits BUSINESS_ADDRESS into STREET, CITY, STATE, ZIP_CODE and COUNTY, checked against a local ZIP table.
+
+    Results are cached by the raw string, so the repeats in a batch (chains, duplicate rows) are parsed once.
+    """
+
+    def __init__(self, zip_table_path=DEFAULT_ZIP_TABLE):
+        self.zip_table = load_zip_table(zip_table_path)
+        self.city_zips = {}  # normalized city -> set of ZIPs
+        for zip_code, (city, _) in self.zip_table.items():
+            self.city_zips.setdefault(normalize_text(city), set()).add(zip_code)
+        self.longest_city = max((len(city.split()) for city in self.city_zips), default=0)
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def normalize(self, address):
+        with self.lock:
+            parsed = self.cache.get(address)
+        if parsed is None:
+            parsed = self.parse(address)
+            with self.lock:
+                if len(self.cache) >= CACHE_LIMIT:
+                    self.cache.clear()
+                self.cache[address] = parsed
+        return dict(parsed)
+
+    def normalize_many(self, addresses):
+        # A whole column at once: each distinct address is parsed once, then every row reads its result
+        addresses = list(addresses)
+        with self.lock:
+            results = {address: self.cache[address] for address in dict.fromkeys(addresses) if address in self.cache}
+        parsed = {address: self.parse(address) for address in dict.fromkeys(addresses) if address not in results}
+        with self.lock:
+            if len(self.cache) + len(parsed) > CACHE_LIMIT:
+                self.cache.clear()
+            self.cache.update(parsed)
+        results.update(parsed)
+        return [dict(results[address]) for address in addresses]
+
+    def parse(self, address):
+        text = ' '.join(SEPARATORS.sub(', ', str(address or '')).split()).strip(' ,')
+        if normalize_text(text) in ('', 'not found'):
+            return {'STREET': '', 'CITY': '', 'STATE': '', 'ZIP_CODE': '', 'COUNTY': ''}
+
+        zip_code = ''
+        match = ZIP_TAIL.search(text)
+        if match:
+            zip_code = match.group(1)
+            text = text[:match.start()]
+        known = self.zip_table.get(zip_code)
+        state = ''
+        match = STATE_TAIL.search(text)
+        # A trailing two-letter word only counts as the state after a comma, when it is CA, or before a ZIP the table
+        # doesn't know: "1 OAK CT" is a street, and so is "1 OAK CT 95678", whose ZIP the table places in CA
+        if match and match.group(2).upper() in US_STATES and (match.group(1) or match.group(2).upper() == 'CA' or (zip_code and not known)):
+            state = 'CA' if known else match.group(2).upper()  # The table only holds California ZIPs
+            text = text[:match.start()]
+
+        segments = [segment for segment in (part.strip() for part in text.strip(' ,').split(',')) if segment]
+        city = ''
+        if len(segments) > 1 and not UNIT_SEGMENT.match(segments[-1]) and not segments[-1][:1].isdigit():
+            city = segments.pop()
+        elif len(segments) == 1:
+            # No comma before the city: "123 MAIN ST ROSEVILLE CA"; only a city the table knows is split off
+            words = segments[0].split()
+            for size in range(min(self.longest_city, len(words) - 1), 0, -1):
+                if normalize_text(' '.join(words[-size:])) in self.city_zips:
+                    city = ' '.join(words[-size:])
+                    segments = [' '.join(words[:-size])]
+                    break
+        street = ', '.join(segments)
+
+        county = ''
+        if known:
+            if not city:
+                city = known[0]
+                count('address.city_from_zip')
+            elif normalize_text(city) != normalize_text(known[0]):
+                count('address.city_mismatch')  # Kept: the post office accepts other town names for many ZIPs
+            county = known[1]
+        elif city and not zip_code:
+            # A missing ZIP stays missing (the table is not every ZIP a town has), but the county is safe to fill
+            counties = {self.zip_table[z][1] for z in self.city_zips.get(normalize_text(city), ())}
+            if len(counties) == 1:
+                county = counties.pop()
+                count('address.county_from_city')
+        if not state and (known or county):
+            state = 'CA'  # The table only holds California ZIPs
+        return {'STREET': street, 'CITY': city, 'STATE': state, 'ZIP_CODE': zip_code, 'COUNTY': county}
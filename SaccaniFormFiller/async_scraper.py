@@ -0,0 +1,373 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from urllib.parse import urljoin
+import license_parser
+from search_strategy import SearchStrategy
+from instrumentation import METRICS, timer, count
+from http_scraper import ABC_BASE_URL, SEARCH_PATH, SINGLE_LICENSE_PATH
+
+CITY_FILTER_SELECTOR = "input.form-control.input-sm[aria-controls='abc_licenses']"
+# Nothing on the license pages needs these, and skipping them keeps each tab small
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font'}
+
+# Lookups run concurrently on one event loop, so "did this lookup error" is tracked per task
+_lookup_failed = contextvars.ContextVar('lookup_failed', default=False)
+
+class AsyncRateLimiter:
+    """RateLimiter for coroutines on a single event loop."""
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_allowed = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        wait_time = self.next_allowed - now
+        self.next_allowed = max(now, self.next_allowed) + self.interval
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
+class AsyncBusinessScraper:
+    """One headless Chromium driven through Playwright's async API, with a tab per in-flight lookup.
+
+    Drop-in for BusinessScraper/ScraperPool: the blocking methods run coroutines on a private
+    event loop thread, and `concurrency` lookups share the browser instead of one Chrome each.
+    """
+
+    def __init__(self, concurrency=16, requests_per_second=2.0, base_url=ABC_BASE_URL, cache=None, chain_index=None,
+                 max_chain_depth=10, license_fields=None, search_strategy=None, match_index=None, search_timeout=10,
+                 page_timeout=10, chrome_arguments=(), headless=True, license_store=None):
+        self.concurrency = concurrency
+        self.rate_limiter = AsyncRateLimiter(requests_per_second)
+        self.base_url = base_url
+        self.cache = cache
+        self.chain_index = chain_index
+        self.match_index = match_index
+        self.license_store = license_store
+        self.max_chain_depth = max_chain_depth
+        self.license_fields = license_fields or license_parser.LICENSE_FIELDS
+        self.search_strategy = search_strategy or SearchStrategy()
+        self.search_timeout = search_timeout
+        self.page_timeout = page_timeout
+        self.chrome_arguments = list(chrome_arguments)
+        self.headless = headless
+        self.outcome_latencies = {}
+        self.stats_lock = threading.Lock()
+        self.ambiguity_reports = []
+
+        self.loop = None
+        self.loop_thread = None
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.semaphore = None
+        self.browser_lock = None
+        self.idle_pages = []
+
+    def setup_driver(self):
+        if self.loop:
+            return
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, name="async-scraper", daemon=True)
+        self.loop_thread.start()
+        self._call(self._start())
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def _start(self):
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.browser_lock = asyncio.Lock()
+        with timer('driver.startup'):
+            self.playwright = await self._start_playwright()
+            await self._launch_browser()
+
+    @staticmethod
+    async def _start_playwright():
+        from playwright.async_api import async_playwright
+        return await async_playwright().start()
+
+    async def _launch_browser(self):
+        self.browser = await self.playwright.chromium.launch(headless=self.headless, args=self.chrome_arguments)
+        self.context = await self.browser.new_context(user_agent="Mozilla/5.0 (SaccaniFormFiller)")
+        self.context.set_default_timeout(self.page_timeout * 1000)
+        await self.context.route("**/*", self._filter_request)
+        self.idle_pages = []
+
+    async def _filter_request(self, route):
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _ensure_browser(self):
+        async with self.browser_lock:
+            if self.browser is None or not self.browser.is_connected():
+                logging.warning("Browser is gone, relaunching")
+                await self._launch_browser()
+
+    async def _take_page(self):
+        # The semaphore caps lookups, so at most `concurrency` tabs are ever open
+        await self._ensure_browser()
+        while self.idle_pages:
+            page = self.idle_pages.pop()
+            if not page.is_closed():
+                return page
+        return await self.context.new_page()
+
+    def _release_page(self, page):
+        if not page.is_closed() and page.context is self.context:
+            self.idle_pages.append(page)
+
+    async def goto(self, page, url):
+        await self.rate_limiter.wait()
+        with timer('browser.goto'):
+            await page.goto(url)
+
+    def scrape_business(self, business_name, city):
+        if not self.loop:
+            self.setup_driver()
+        return self._call(self.scrape_business_async(business_name, city))
+
+    def scrape_all(self, queries):
+        # Same contract as ScraperPool.scrape_all: results in input order, a bounded number of lookups queued ahead
+        if not self.loop:
+            self.setup_driver()
+        pending = deque()
+        for business_name, city in queries:
+            pending.append((business_name, asyncio.run_coroutine_threadsafe(self.scrape_business_async(business_name, city), self.loop)))
+            if len(pending) >= self.concurrency * 2:
+                yield self._outcome(*pending.popleft())
+        while pending:
+            yield self._outcome(*pending.popleft())
+
+    @staticmethod
+    def _outcome(business_name, future):
+        try:
+            return future.result()
+        except Exception as e:
+            logging.error(f"Lookup failed for '{business_name}': {str(e)}")
+            return e
+
+    async def scrape_business_async(self, business_name, city):
+        async with self.semaphore:
+            with timer('scrape.lookup'):
+                return await self.lookup_business(business_name, city)
+
+    async def lookup_business(self, business_name, city):
+        # The license store, cache and indexes are SQLite; their calls run in worker threads so they don't stall the other tabs
+        if self.license_store:
+            stored = await asyncio.to_thread(self.license_store.find_business, business_name, city)
+            if stored:
+                count('license_store.hits')
+                logging.info(f"License store hit for '{business_name}' in {city}")
+                return stored
+
+        if self.cache:
+            found, cached = await asyncio.to_thread(self.cache.get_business, business_name, city)
+            if found:
+                logging.info(f"Cache hit for '{business_name}' in {city}")
+                return cached
+
+        _lookup_failed.set(False)
+        result = None
+        try:
+            page = await self._take_page()
+        except Exception as e:
+            logging.error(f"Could not open a browser tab for '{business_name}': {str(e)}")
+            return None
+        try:
+            if self.match_index:
+                license_number = await asyncio.to_thread(self.match_index.best_match, business_name, city)
+                if license_number:
+                    count('match_index.hits')
+                    logging.info(f"Local match for '{business_name}' in {city}: license {license_number}")
+                    result = await self.scrape_license(page, license_number)
+            if not result:
+                result = await self.scrape_variations(page, business_name, city)
+        finally:
+            self._release_page(page)
+
+        if self.cache and (result or not _lookup_failed.get()):
+            await asyncio.to_thread(self.cache.put_business, business_name, city, result)
+            if result:
+                await asyncio.to_thread(self.cache.put_license, result.get('LICENSE_NUMBER'), result)
+        if self.match_index and result:
+            await asyncio.to_thread(self.match_index.add_result, business_name, city, result)
+        return result
+
+    async def scrape_license(self, page, license_number):
+        if self.license_store:
+            stored = await asyncio.to_thread(self.license_store.get_license, license_number)
+            if stored:
+                count('license_store.hits')
+                return stored
+        try:
+            return await self.open_license(page, license_number, [])
+        except Exception as e:
+            logging.error(f"Error fetching license {license_number}: {str(e)}")
+            _lookup_failed.set(True)
+            return None
+
+    async def scrape_variations(self, page, business_name, city):
+        for variant_type, variation in self.search_strategy.variations(business_name, city):
+            count('search.variants_tried')
+            result = await self.search_and_scrape(page, variation, city)
+            if not _lookup_failed.get():
+                self.search_strategy.record(business_name, city, variant_type, variation, bool(result))
+            if result:
+                return result
+
+        logging.warning(f"No results found for all variations of '{business_name}' in {city}")
+        return None
+
+    async def search_and_scrape(self, page, business_name, city):
+        try:
+            await self.goto(page, self.base_url + SEARCH_PATH)
+            await page.fill("#BusinessName", business_name)
+            await page.press("#BusinessName", "Enter")
+
+            outcome, tree = await self.wait_for_search_outcome(page)
+            if outcome == 'details':
+                return await self.follow_license_chain(page, tree, [])
+            elif outcome == 'results':
+                return await self.perform_city_search(page, city)
+            elif outcome == 'empty':
+                logging.info(f"No results found for '{business_name}'")
+                return None
+            else:
+                logging.info(f"No search outcome for '{business_name}' after {self.search_timeout}s")
+                return None
+        except Exception as e:
+            logging.error(f"Error searching for business '{business_name}': {str(e)}")
+            _lookup_failed.set(True)
+            return None
+
+    async def wait_for_search_outcome(self, page):
+        # Poll the rendered page with the same checks the HTTP client uses; the other tabs run while this one sleeps
+        start = time.monotonic()
+        outcome, tree = 'timeout', None
+        while time.monotonic() - start < self.search_timeout:
+            try:
+                tree = license_parser.parse_page(await page.content())
+            except Exception:
+                tree = None  # Mid-navigation
+            if tree is not None:
+                if license_parser.is_details_page(tree):
+                    outcome = 'details'
+                    break
+                if license_parser.has_results_table(tree):
+                    outcome = 'results'
+                    break
+                if license_parser.is_no_results_page(tree):
+                    outcome = 'empty'
+                    break
+            await asyncio.sleep(0.1)
+        if outcome == 'timeout':
+            count('search.timeouts')
+        latency = time.monotonic() - start
+        METRICS.record(f'search.wait.{outcome}', latency)
+        with self.stats_lock:
+            self.outcome_latencies.setdefault(outcome, []).append(latency)
+        return outcome, tree
+
+    def outcome_latency_summary(self):
+        with self.stats_lock:
+            return {outcome: {'count': len(times), 'mean': sum(times) / len(times), 'max': max(times)}
+                    for outcome, times in self.outcome_latencies.items() if times}
+
+    async def perform_city_search(self, page, city):
+        # Only the first page of the results table is rendered, so filter it by city first
+        await page.fill(CITY_FILTER_SELECTOR, city)
+        await page.wait_for_selector("table#abc_licenses", state='visible')
+        rows = license_parser.parse_results_table(license_parser.parse_page(await page.content()))
+        candidates = license_parser.rank_candidates(rows, city)
+        if not candidates:
+            return None
+        await self.goto(page, urljoin(page.url, candidates[0]['href']))
+        return await self.follow_license_chain(page, await self.details_tree(page), [])
+
+    async def details_tree(self, page):
+        await page.wait_for_selector("xpath=" + license_parser.STATUS_XPATH)
+        return license_parser.parse_page(await page.content())
+
+    async def open_license(self, page, license_number, visited):
+        if self.cache:
+            found, cached = await asyncio.to_thread(self.cache.get_license, license_number)
+            if found and cached:
+                logging.info(f"Cache hit for license {license_number}")
+                return cached
+        await self.goto(page, urljoin(self.base_url, SINGLE_LICENSE_PATH.format(license_number)))
+        return await self.follow_license_chain(page, await self.details_tree(page), visited)
+
+    async def follow_license_chain(self, page, tree, visited):
+        status = license_parser.parse_license_status(tree)
+        license_number = license_parser.first_text(tree, license_parser.LICENSE_FIELD_XPATHS['LICENSE_NUMBER']) or ""
+        if license_number:
+            visited.append(license_number)
+
+        if status == "ACTIVE":
+            logging.info("Found active license. Extracting details.")
+            with timer('license.extract_fields'):
+                return license_parser.parse_license_details(tree, self.license_fields)
+        elif status == "CANCELED":
+            if len(visited) > self.max_chain_depth:
+                logging.warning(f"License chain exceeds {self.max_chain_depth} hops: {' -> '.join(visited)}")
+                return None
+
+            shortcut = None
+            if self.chain_index and license_number:
+                shortcut = await asyncio.to_thread(self.chain_index.shortcut, license_number, visited)
+            if shortcut:
+                logging.info(f"Known transfer chain {license_number} -> {shortcut}, skipping intermediate licenses.")
+                return await self.open_license(page, shortcut, visited)
+
+            new_license_number, href = license_parser.parse_transfer_link(tree)
+            if not href:
+                logging.error("Canceled license has no transfer link")
+                return None
+            logging.info(f"Found new license number: {new_license_number}")
+            if self.chain_index and license_number:
+                await asyncio.to_thread(self.chain_index.record_transfer, license_number, new_license_number)
+            if new_license_number in visited:
+                logging.warning(f"License transfer cycle detected: {' -> '.join(visited + [new_license_number])}")
+                return None
+            if self.cache:
+                found, cached = await asyncio.to_thread(self.cache.get_license, new_license_number)
+                if found and cached:
+                    logging.info(f"Cache hit for license {new_license_number}")
+                    return cached
+            count('license.transfers')
+            await self.goto(page, urljoin(page.url, href))
+            return await self.follow_license_chain(page, await self.details_tree(page), visited)
+        else:
+            logging.warning(f"Unexpected license status: {status}")
+            return None
+
+    def close_driver(self):
+        self.search_strategy.save()
+        if not self.loop:
+            return
+        try:
+            self._call(self._stop())
+        except Exception as e:
+            logging.warning(f"Error while closing browser: {str(e)}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
+        self.loop.close()
+        self.loop = None
+
+    async def _stop(self):
+        self.idle_pages = []
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
@@ -0,0 +1,188 @@
+import html
+import random
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from http_scraper import SEARCH_PATH, SINGLE_LICENSE_PATH
+from normalize import normalize_text
+
+# Stand-in for the ABC license lookup. There are no recorded pages in the repo, so pages are built from
+# templates with the markup license_parser reads: the search form, a details page (active, or canceled
+# with a transfer link), a server-rendered results table, and the "no results" page.
+
+SEARCH_FORM_PAGE = """<html><body><h1>License Query System</h1>
+<form action="{path}" method="get">
+<input type="hidden" name="RPTTYPE" value="3">
+<input type="text" id="BusinessName" name="BusinessName" value="">
+<input type="submit" value="Search">
+</form></body></html>"""
+
+DETAILS_PAGE = """<html><body><div id="et-boc"><h2>License Information</h2>
+<h2>Business Name</h2><p>{name}</p>
+<h2>Business Address</h2><p>{street}<br>{city}, CA {zip_code}</p>
+<dl>
+<dt>License Number:</dt><dd>{license_number}</dd>
+<dt>Primary Owner:</dt><dd>{owner}</dd>
+<dt>County:</dt><dd>{county}</dd>
+<dt>License Type Status:</dt><dd>{status}</dd>
+<dt>Transfers:</dt><dd>{transfers}</dd>
+</dl></div></body></html>"""
+
+TRANSFER_LINK = '<a href="{href}">{license_number}</a>'
+
+RESULTS_PAGE = """<html><body><label>Search: <input type="search" class="form-control input-sm" aria-controls="abc_licenses"></label>
+<table id="abc_licenses"><thead><tr><th>License</th><th>Name</th><th>Address</th><th>Type</th></tr></thead>
+<tbody>{rows}</tbody></table></body></html>"""
+
+RESULT_ROW = """<tr><td><a href="{href}">{license_number}</a></td><td>{name}</td><td>{street}, {city}, CA {zip_code}</td><td>41 - ON-SALE BEER AND WINE ({status})</td></tr>"""
+
+NO_RESULTS_PAGE = """<html><body><h1>License Query System</h1><p>No results found for "{query}".</p></body></html>"""
+
+# Share of searches per outcome, by a stable hash of the name; roughly what our account lists see
+OUTCOMES = [(55, 'details'), (65, 'transfer'), (85, 'results'), (100, 'empty')]
+STREETS = ["MAIN ST", "J ST", "FOLSOM BLVD", "AUBURN BLVD", "SUNRISE BLVD", "BROADWAY", "STOCKTON BLVD", "GREENBACK LN"]
+
+def name_key(query):
+    # The real search matches on the leading words, so every variant of a name lands on the same record
+    return ' '.join(normalize_text(query).replace("'", "").split()[:2])
+
+class FakeAbcSite:
+    """Threaded local HTTP server answering like the ABC license lookup, with configurable latency per request."""
+
+    def __init__(self, latency=0.05, jitter=0.0, cities_by_name=None, default_city="SACRAMENTO", host="127.0.0.1", port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.cities_by_name = cities_by_name or {}  # name_key -> city, so details pages land in the account's city
+        self.default_city = default_city
+        self.licenses = {}  # license number -> (name, city, status, transfer target)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.server = ThreadingHTTPServer((host, port), self.handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-abc-site", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.respond(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def respond(self, request):
+        with self.lock:
+            self.requests += 1
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+
+        url = urlparse(request.path)
+        params = parse_qs(url.query)
+        if url.path == urlparse(SEARCH_PATH).path and 'BusinessName' in params:
+            body = self.search_page(params['BusinessName'][0])
+        elif url.path == urlparse(SEARCH_PATH).path:
+            body = SEARCH_FORM_PAGE.format(path=SEARCH_PATH)
+        elif 'LICENSE' in params:
+            body = self.details_page(params['LICENSE'][0])
+        else:
+            request.send_error(404)
+            return
+
+        data = body.encode('utf-8')
+        request.send_response(200)
+        request.send_header("Content-Type", "text/html; charset=utf-8")
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def register(self, license_number, name, city, status='ACTIVE', transfer_to=None):
+        with self.lock:
+            self.licenses.setdefault(license_number, (name, city, status, transfer_to))
+
+    def search_page(self, query):
+        key = name_key(query)
+        if not key:
+            return NO_RESULTS_PAGE.format(query=html.escape(query))
+        bucket = zlib.crc32(key.encode('utf-8')) % 100
+        outcome = next(outcome for limit, outcome in OUTCOMES if bucket < limit)
+        base_number = str(100000 + zlib.crc32(key.encode('utf-8')) % 800000 * 10)
+        name = key.upper()
+        city = self.cities_by_name.get(key, self.default_city)
+
+        if outcome == 'details':
+            self.register(base_number, name, city)
+            return self.details_page(base_number)
+        if outcome == 'transfer':
+            # Canceled license whose transfer link leads to the active one
+            active_number = str(int(base_number) + 1)
+            self.register(active_number, name, city)
+            self.register(base_number, name, city, status='CANCELED', transfer_to=active_number)
+            return self.details_page(base_number)
+        if outcome == 'results':
+            rows = []
+            for offset, row_city in enumerate([city, self.default_city, "DAVIS"]):
+                license_number = str(int(base_number) + 2 + offset)
+                self.register(license_number, f"{name} #{offset + 1}", row_city)
+                rows.append(RESULT_ROW.format(href=html.escape(SINGLE_LICENSE_PATH.format(license_number)), license_number=license_number,
+                                              name=html.escape(f"{name} #{offset + 1}"), street=self.street(license_number),
+                                              city=row_city, zip_code=self.zip_code(license_number), status='ACTIVE'))
+            return RESULTS_PAGE.format(rows="\n".join(rows))
+        return NO_RESULTS_PAGE.format(query=html.escape(query))
+
+    def details_page(self, license_number):
+        with self.lock:
+            name, city, status, transfer_to = self.licenses.get(license_number, (f"BUSINESS {license_number}", self.default_city, 'ACTIVE', None))
+        transfers = ""
+        if transfer_to:
+            transfers = TRANSFER_LINK.format(href=html.escape(SINGLE_LICENSE_PATH.format(transfer_to)), license_number=transfer_to)
+        return DETAILS_PAGE.format(name=html.escape(name), street=self.street(license_number), city=city,
+                                   zip_code=self.zip_code(license_number), license_number=license_number,
+                                   owner=f"OWNER {license_number}", county="SACRAMENTO", status=status, transfers=transfers)
+
+    @staticmethod
+    def street(license_number):
+        number = int(license_number)
+        return f"{number % 9000 + 100} {STREETS[number % len(STREETS)]}"
+
+    @staticmethod
+    def zip_code(license_number):
+        return str(95600 + int(license_number) % 300)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve the fake ABC license lookup until interrupted.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    args = parser.parse_args()
+    site = FakeAbcSite(latency=args.latency, port=args.port).start()
+    print(f"Fake ABC site at {site.base_url}{SEARCH_PATH}")
+    try:
+        site.thread.join()
+    except KeyboardInterrupt:
+        site.stop()
@@ -0,0 +1,66 @@
+import argparse
+import csv
+import os
+import random
+from input_reader import iter_csv
+
+SOURCE_LIST = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Account list", "account_list.csv")
+SIZES = [100, 1000, 10000]
+DUPLICATE_RATE = 0.018  # Share of rows repeating an earlier Client/City, as in account_list.csv
+WORDS = ["MARKET", "LIQUOR", "DELI", "CAFE", "GROCERY", "BAR", "GRILL", "FOOD", "MART", "SPIRITS", "PIZZA", "TAQUERIA"]
+
+def load_patterns(source=SOURCE_LIST):
+    # Client names and cities from the real export; the generator recombines them
+    clients, cities = [], []
+    for record in iter_csv(source):
+        if record.get('Client'):
+            clients.append(record['Client'])
+        if record.get('City'):
+            cities.append(record['City'])
+    return clients, cities
+
+def synthetic_client(rng, clients):
+    client = rng.choice(clients)
+    roll = rng.random()
+    if roll < 0.15:
+        client = f"{client.split(' #')[0]} #{rng.randint(100, 39999)}"  # Chain stores with a store number
+    elif roll < 0.30:
+        client = f"{client.split()[0]} {rng.choice(WORDS)}"
+    elif roll < 0.40:
+        client = client.title()
+    return client
+
+def generate_accounts(size, clients, cities, seed=0, first_account=100000):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(size):
+        if rows and rng.random() < DUPLICATE_RATE:
+            client, city = rng.choice(rows)[1:]
+        else:
+            client, city = synthetic_client(rng, clients), rng.choice(cities)
+        rows.append((str(first_account + i), client, city))
+    return rows
+
+def write_accounts(path, rows):
+    # Same layout as the export, including the padded cells and the "Client " header
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Account #", "City", "Client "])
+        for account, client, city in rows:
+            writer.writerow([account, f"{city:<15}", f"{client:<28}"])
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic account lists shaped like account_list.csv.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--output", default="benchmarks/data")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    os.makedirs(args.output, exist_ok=True)
+    clients, cities = load_patterns()
+    for size in args.sizes:
+        path = write_accounts(os.path.join(args.output, f"accounts_{size}.csv"), generate_accounts(size, clients, cities, args.seed))
+        print(f"{size} accounts written to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from benchmarks.fake_abc_site import FakeAbcSite, name_key
+from benchmarks.generate_accounts import load_patterns, generate_accounts, write_accounts
+from instrumentation import METRICS
+
+# Run from SaccaniFormFiller/:
+#   python -m benchmarks.run_benchmarks --sizes 100 1000 --output benchmarks/results.json
+#   python -m benchmarks.run_benchmarks --sizes 100 --baseline benchmarks/results.json
+# Every result has a per-minute rate (lookups or forms); --baseline flags rates that dropped by more than --tolerance.
+
+BENCHMARKS = ["scraper", "scraper_pool", "address", "pdf_overlay", "pdf_acroform", "end_to_end"]
+DEFAULT_TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "BASE.pdf")
+
+def sample_record(account, client, city, index):
+    # What build_account_record hands the fillers, without a scrape
+    return {
+        'ACCOUNT_NUMBER': account, 'LICENSE_NUMBER': str(500000 + index), 'BUSINESS_NAME': client.upper(),
+        'PRIMARY_OWNER': f"OWNER {index}", 'BUSINESS_ADDRESS': f"{100 + index} MAIN ST, {city.upper()}, CA 95814",
+        'STREET': f"{100 + index} MAIN ST", 'CITY': city.upper(), 'STATE': 'CA', 'ZIP_CODE': '95814', 'COUNTY': 'SACRAMENTO',
+        'Phone Number': '916-555-0100', 'Buyer': 'Owner', 'Route #': str(index % 12), 'Salesperson': 'Bench',
+        'New Account': 'on', 'Monday': 'on', 'Thursday': 'on', 'On Sale': 'on', 'Market Type Bar': 'on',
+    }
+
+def result(name, size, items, seconds, unit):
+    report = METRICS.report()
+    return {
+        'benchmark': name,
+        'size': size,
+        'items': items,
+        'unit': unit,
+        'seconds': round(seconds, 3),
+        'per_minute': round(items / seconds * 60, 1) if seconds else None,
+        'timings': report['timings'],
+        'counters': report['counters'],
+    }
+
+def bench_scraper(rows, site, args):
+    from scraper import BusinessScraper
+    from search_strategy import SearchStrategy
+    scraper = BusinessScraper(base_url=site.base_url, search_strategy=SearchStrategy())
+    start = time.perf_counter()
+    found = sum(1 for account_data in scraper.scrape_all((client, city) for _, client, city in rows) if account_data and not isinstance(account_data, Exception))
+    elapsed = time.perf_counter() - start
+    scraper.close_driver()
+    logging.info(f"scraper: {found}/{len(rows)} found")
+    return result("scraper", len(rows), len(rows), elapsed, "lookups")
+
+def bench_scraper_pool(rows, site, args):
+    from scraper_pool import ScraperPool
+    from search_strategy import SearchStrategy
+    pool = ScraperPool(size=args.workers, requests_per_second=args.rps, base_url=site.base_url, search_strategy=SearchStrategy())
+    start = time.perf_counter()
+    pool.setup_driver()
+    found = sum(1 for account_data in pool.scrape_all((client, city) for _, client, city in rows) if account_data and not isinstance(account_data, Exception))
+    elapsed = time.perf_counter() - start
+    pool.close_driver()
+    logging.info(f"scraper_pool: {found}/{len(rows)} found")
+    return result("scraper_pool", len(rows), len(rows), elapsed, "lookups")
+
+def sample_address(city, index):
+    # The shapes BUSINESS_ADDRESS arrives in: the site's <br> line break, a suite segment, a missing ZIP
+    street = f"{100 + index} MAIN ST"
+    return [f"{street}\n{city.upper()}, CA 95814", f"{street}, STE {index % 40}, {city.upper()}, CA 95814-1234",
+            f"{street}, {city.upper()}, CA", f"{street} {city.upper()} CA 95814"][index % 4]
+
+def bench_address(rows, site, args):
+    from address import AddressNormalizer
+    addresses = [sample_address(city, index) for index, (_, _, city) in enumerate(rows)]
+    start = time.perf_counter()
+    AddressNormalizer().normalize_many(addresses)
+    elapsed = time.perf_counter() - start
+    return result("address", len(rows), len(rows), elapsed, "addresses")
+
+def bench_filler(name, filler_factory, rows, args):
+    filler = filler_factory()
+    output_folder = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    try:
+        start = time.perf_counter()
+        for index, (account, client, city) in enumerate(rows):
+            filler.fill_pdf(sample_record(account, client, city, index), args.template, output_folder)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(output_folder, ignore_errors=True)
+    return result(name, len(rows), len(rows), elapsed, "forms")
+
+def bench_pdf_overlay(rows, site, args):
+    from pdf_filler import PDFFiller
+    return bench_filler("pdf_overlay", PDFFiller, rows, args)
+
+def bench_pdf_acroform(rows, site, args):
+    from pdf_filler2 import PDFFiller
+    return bench_filler("pdf_acroform", PDFFiller, rows, args)
+
+def bench_end_to_end(rows, site, args):
+    from input_reader import open_input_file
+    from pdf_filler import PDFFiller
+    from pipeline import BatchPipeline
+    from scraper_pool import ScraperPool
+    from search_strategy import SearchStrategy
+    work_folder = tempfile.mkdtemp(prefix="bench_end_to_end_")
+    try:
+        input_path = write_accounts(os.path.join(work_folder, "accounts.csv"), rows)
+        pool = ScraperPool(size=args.workers, requests_per_second=args.rps, base_url=site.base_url, search_strategy=SearchStrategy())
+        pipeline = BatchPipeline(pool, PDFFiller(), pdf_workers=args.pdf_workers)
+        written = []
+        start = time.perf_counter()
+        pool.setup_driver()
+        _, businesses = open_input_file(input_path)
+        pipeline.run(businesses, args.template, os.path.join(work_folder, "out"), {},
+                     on_event=lambda kind, index, business, detail: written.append(index) if kind == 'pdf_written' else None)
+        elapsed = time.perf_counter() - start
+        pool.close_driver()
+    finally:
+        shutil.rmtree(work_folder, ignore_errors=True)
+    logging.info(f"end_to_end: {len(written)} forms from {len(rows)} accounts")
+    return result("end_to_end", len(rows), len(written), elapsed, "forms")
+
+def compare(results, baseline_path, tolerance):
+    # Benchmarks whose rate fell more than `tolerance` below the baseline run
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(entry['benchmark'], entry['size']): entry for entry in json.load(f)['results']}
+    regressions = []
+    for entry in results:
+        previous = baseline.get((entry['benchmark'], entry['size']))
+        if not previous or not previous.get('per_minute') or entry['per_minute'] is None:
+            continue
+        change = entry['per_minute'] / previous['per_minute'] - 1
+        entry['change_vs_baseline'] = round(change, 3)
+        if change < -tolerance:
+            regressions.append(f"{entry['benchmark']} @ {entry['size']}: {previous['per_minute']} -> {entry['per_minute']} "
+                               f"{entry['unit']}/min ({change * 100:+.1f}%)")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time the scrapers, both PDF fillers and the whole pipeline against a local stand-in for the ABC site.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100], help="Account list sizes, e.g. 100 1000 10000")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fake site waits before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--workers", type=int, default=4, help="Scrapers in the pool")
+    parser.add_argument("--pdf-workers", type=int, default=2)
+    parser.add_argument("--rps", type=float, default=0, help="Pool request cap; 0 disables it so the site latency is the limit")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results JSON here as well as to stdout")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed drop in a rate before it counts as a regression")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.ERROR, stream=sys.stderr, format="%(levelname)s %(message)s")
+    clients, cities = load_patterns()
+    results = []
+    for size in args.sizes:
+        rows = generate_accounts(size, clients, cities, seed=args.seed)
+        cities_by_name = {name_key(client): city.upper() for _, client, city in rows}
+        with FakeAbcSite(latency=args.latency, jitter=args.jitter, cities_by_name=cities_by_name) as site:
+            for name in args.only:
+                METRICS.reset()
+                print(f"Running {name} with {size} accounts", file=sys.stderr)
+                with contextlib.redirect_stdout(sys.stderr):  # The fillers print per PDF; stdout carries only the JSON
+                    entry = globals()[f"bench_{name}"](rows, site, args)
+                print(f"  {entry['items']} {entry['unit']} in {entry['seconds']}s, {entry['per_minute']} {entry['unit']}/min", file=sys.stderr)
+                results.append(entry)
+
+    report = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'results': results,
+    }
+    regressions = compare(results, args.baseline, args.tolerance) if args.baseline else []
+    report['regressions'] = regressions
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    for line in regressions:
+        print(f"Regression: {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from input_reader import open_input_file
+from form_fields import default_additional_info, load_profile
+from pipeline import BatchPipeline
+from address import AddressNormalizer, DEFAULT_ZIP_TABLE
+from instrumentation import METRICS, RUN_REPORT_NAME
+from scraper import DEFAULT_CHROMEDRIVER_PATH
+from scraper_pool import ScraperPool
+from lookup_cache import LookupCache, DEFAULT_CACHE_PATH
+from license_chain import LicenseChainIndex
+from license_index import LicenseMatchIndex
+from license_store import LicenseStore, DEFAULT_STORE_PATH
+from search_strategy import SearchStrategy, DEFAULT_STATS_PATH
+
+# Exit codes: every row produced a PDF / some rows failed or had no data / the run itself failed
+EXIT_OK = 0
+EXIT_PARTIAL = 1
+EXIT_ERROR = 2
+
+DEFAULT_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "BASE.pdf")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape ABC license details for an account list and fill the Saccani account forms, without the GUI.")
+    parser.add_argument("--input", required=True, help="Account list (.csv, .xlsx, .xls, .docx or .txt)")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="PDF template (default: BASE.pdf)")
+    parser.add_argument("--output", required=True, help="Output folder for PDFs, the run journal and the summary")
+    parser.add_argument("--profile", help="JSON or YAML file with Additional Info text values and checkbox states")
+    parser.add_argument("--engine", choices=["pool", "async"], default="pool",
+                        help="pool runs one Chrome per worker; async runs one Playwright browser with a tab per lookup")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel scrapers for the pool engine (default: 4)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Lookups in flight for the async engine (default: 16)")
+    parser.add_argument("--pdf-workers", type=int, default=2, help="PDF rendering processes, 0 renders inline (default: 2)")
+    parser.add_argument("--requests-per-second", type=float, default=2.0, help="Overall request cap for the ABC site (default: 2)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="SQLite lookup cache file")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the lookup cache")
+    parser.add_argument("--cache-ttl-days", type=float, default=7, help="Days before a cached license lookup is refreshed")
+    parser.add_argument("--negative-ttl-days", type=float, default=1, help="Days before a cached 'no results' is retried")
+    parser.add_argument("--license-store", default=DEFAULT_STORE_PATH,
+                        help="Local store imported from a bulk license export (python license_store.py EXPORT), asked before the site")
+    parser.add_argument("--no-license-store", action="store_true", help="Always look businesses up on the site")
+    parser.add_argument("--zip-table", default=DEFAULT_ZIP_TABLE,
+                        help="CSV with zip,city,county columns, used to check and fill in the parsed addresses (default: zip_codes.csv)")
+    parser.add_argument("--resume", action="store_true", help="Skip accounts whose PDF from the same input is already in the output folder")
+    parser.add_argument("--output-mode", choices=["per_account", "combined"], default="per_account")
+    parser.add_argument("--group-by", choices=["Route #", "Salesperson"], help="With --output-mode combined, one PDF per route or salesperson")
+    parser.add_argument("--filler", choices=["overlay", "acroform"], default="overlay",
+                        help="overlay draws on the template (pdf_filler), acroform fills its form fields (pdf_filler2)")
+    parser.add_argument("--chromedriver", default=DEFAULT_CHROMEDRIVER_PATH, help="Path to chromedriver for the Selenium fallback")
+    parser.add_argument("--no-sandbox", action="store_true", help="Start Chrome with --no-sandbox (needed in most containers)")
+    parser.add_argument("--no-http", action="store_true", help="Always use Selenium instead of the HTTP fast path")
+    parser.add_argument("--summary", help="Also write the JSON summary to this file")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    args = parser.parse_args(argv)
+    if args.group_by and args.output_mode != "combined":
+        parser.error("--group-by needs --output-mode combined")
+    if args.filler == "acroform" and args.output_mode == "combined":
+        parser.error("--output-mode combined needs the overlay filler; --filler acroform writes one PDF per account")
+    return args
+
+def build_scraper(args):
+    scraper_kwargs = {
+        'search_strategy': SearchStrategy(DEFAULT_STATS_PATH),
+        'chrome_arguments': ["--no-sandbox", "--disable-dev-shm-usage"] if args.no_sandbox else [],
+    }
+    if not args.no_cache:
+        scraper_kwargs['cache'] = LookupCache(args.cache, ttl=args.cache_ttl_days * 86400, negative_ttl=args.negative_ttl_days * 86400)
+        scraper_kwargs['chain_index'] = LicenseChainIndex(args.cache)
+        scraper_kwargs['match_index'] = LicenseMatchIndex(args.cache)
+    if not args.no_license_store:
+        scraper_kwargs['license_store'] = LicenseStore(args.license_store)
+    if args.engine == "async":
+        from async_scraper import AsyncBusinessScraper
+        return AsyncBusinessScraper(concurrency=args.concurrency, requests_per_second=args.requests_per_second, **scraper_kwargs)
+    return ScraperPool(size=args.workers, requests_per_second=args.requests_per_second, chromedriver_path=args.chromedriver,
+                       use_http=not args.no_http, **scraper_kwargs)
+
+def build_pdf_filler(args):
+    if args.filler == "acroform":
+        from pdf_filler2 import PDFFiller
+    else:
+        from pdf_filler import PDFFiller
+    return PDFFiller()
+
+def run(args):
+    started = time.time()
+    METRICS.reset()
+    additional_info = load_profile(args.profile) if args.profile else default_additional_info()
+    total, businesses = open_input_file(args.input)
+    counts = {'scraped': 0, 'pdf_written': 0, 'no_data': 0, 'failed': 0, 'skipped': 0}
+    failures = []
+
+    def on_event(kind, index, business, detail):
+        counts[kind] += 1
+        if kind == 'pdf_written':
+            logging.info(f"[{index + 1}/{total or '?'}] PDF saved: {detail}")
+        elif kind in ('no_data', 'failed'):
+            reason = detail or "No data found"
+            failures.append({'row': index, 'account': business.get('Account #', ''), 'client': business.get('Client', ''), 'reason': reason})
+            logging.warning(f"[{index + 1}/{total or '?'}] {business.get('Client', 'Unknown')}: {reason}")
+
+    scraper = build_scraper(args)
+    pipeline = BatchPipeline(scraper, build_pdf_filler(args), pdf_workers=args.pdf_workers, output_mode=args.output_mode,
+                             group_by=args.group_by, resume=args.resume, addresses=AddressNormalizer(args.zip_table))
+    try:
+        scraper.setup_driver()
+        pipeline.run(businesses, args.template, args.output, additional_info, on_event=on_event)
+    finally:
+        scraper.close_driver()
+
+    rows = counts['pdf_written'] + counts['no_data'] + counts['failed'] + counts['skipped']
+    summary = {
+        'status': 'ok' if not failures else 'partial',
+        'rows': rows,
+        'pdf_written': counts['pdf_written'],
+        'skipped': counts['skipped'],
+        'no_data': counts['no_data'],
+        'failed': counts['failed'],
+        'lookups_saved': pipeline.duplicates.lookups_saved,
+        'combined_paths': pipeline.combined_paths,
+        'cache': dict(scraper.cache.stats) if scraper.cache else None,
+        'license_store': dict(scraper.license_store.stats) if scraper.license_store else None,
+        'elapsed_seconds': round(time.time() - started, 2),
+        'run_report': os.path.join(args.output, RUN_REPORT_NAME) if pipeline.report else None,
+        'failures': failures,
+    }
+    return summary
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level), stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        summary = run(args)
+        exit_code = EXIT_OK if summary['status'] == 'ok' else EXIT_PARTIAL
+    except Exception as e:
+        logging.exception("Batch run failed")
+        summary = {'status': 'error', 'error': str(e)}
+        exit_code = EXIT_ERROR
+
+    # Machine-readable result on stdout; logs go to stderr
+    output = json.dumps(summary, indent=2)
+    print(output)
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            f.write(output + "\n")
+    return exit_code
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
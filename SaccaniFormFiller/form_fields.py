@@ -0,0 +1,67 @@
+import json
+import os
+
+# Fields on the "Additional Info" tab. The same values can come from a profile file in batch runs.
+ADDITIONAL_TEXT_FIELDS = [
+    "Old Account #", "Old DBA Name", "Account Number for Changes only",
+    "Buyer", "Receiving Times", "Special Instructions", "Phone Number",
+    "Route #", "Salesperson", "Account Number"
+]
+
+ADDITIONAL_CHECKBOX_FIELDS = {
+    "New Account": "New Account",
+    "Close Account": "Close Account",
+    "Change or Add Info": "Change or Add Info",
+    "Delivery Location Front": "Delivery Location Front",
+    "Delivery Location Back": "Delivery Location Back",
+    "Delivery Location Side": "Delivery Location Side",
+    "Monday": "Monday",
+    "Tuesday": "Tuesday",
+    "Wednesday": "Wednesday",
+    "Thursday": "Thursday",
+    "Friday": "Friday",
+    "Credit Application Yes": "Credit Application Yes",
+    "Credit Application No": "Credit Application No",
+    "On Sale": "On Sale",
+    "Off-Sale": "Off-Sale",
+    "Draft Status Ours": "Draft Status Ours",
+    "Draft Status Theirs": "Draft Status Theirs",
+    "Draft Status Ours & Theirs": "Draft Status Ours & Theirs",
+    "Draft Status Other": "Draft Status Other",
+    "Market Type Bar": "Market Type Bar",
+    "Market Type Restaurant": "Market Type Restaurant",
+    "Market Type Grocery": "Market Type Grocery",
+    "Market Type Deli": "Market Type Deli",
+    "Market Type Convenience": "Market Type Convenience",
+    "Market Type Other": "Market Type Other",
+    "Buying Yes": "Buying Yes",
+    "Buying No": "Buying No"
+}
+
+def default_additional_info():
+    values = {field: "" for field in ADDITIONAL_TEXT_FIELDS}
+    values.update({field: "Off" for field in ADDITIONAL_CHECKBOX_FIELDS})
+    return values
+
+def load_profile(profile_path):
+    # JSON or YAML file with text values and checkbox states, either flat or under "additional_info"
+    _, file_extension = os.path.splitext(profile_path)
+    with open(profile_path, 'r', encoding='utf-8') as f:
+        if file_extension.lower() in ('.yaml', '.yml'):
+            import yaml
+            profile = yaml.safe_load(f) or {}
+        else:
+            profile = json.load(f)
+    profile = profile.get('additional_info', profile)
+
+    values = default_additional_info()
+    for field, value in profile.items():
+        if field not in values:
+            raise ValueError(f"Unknown field in profile {profile_path}: {field}")
+        if field in ADDITIONAL_CHECKBOX_FIELDS:
+            # Checkboxes use the GUI's "on"/"Off" states
+            checked = value if isinstance(value, bool) else str(value).strip().lower() in ('on', 'yes', 'true', '1')
+            values[field] = "on" if checked else "Off"
+        else:
+            values[field] = "" if value is None else str(value)
+    return values
@@ -1,38 +1,48 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
-import os
-import pandas as pd
+import queue
+import logging
+from collections import deque
 from ttkbootstrap import Style
-import openpyxl
-import docx
-import csv
-
-def read_input_file(file_path):
-    _, file_extension = os.path.splitext(file_path)
-    
-    if file_extension.lower() == '.csv':
-        return pd.read_csv(file_path).to_dict('records')
-    elif file_extension.lower() in ['.xlsx', '.xls']:
-        return pd.read_excel(file_path).to_dict('records')
-    elif file_extension.lower() == '.docx':
-        doc = docx.Document(file_path)
-        lines = [para.text for para in doc.paragraphs if para.text.strip()]
-        headers = lines[0].split(',')
-        return [dict(zip(headers, line.split(','))) for line in lines[1:]]
-    elif file_extension.lower() == '.txt':
-        with open(file_path, 'r') as file:
-            reader = csv.DictReader(file)
-            return list(reader)
-    else:
-        raise ValueError(f"Unsupported file type: {file_extension}")
+import itertools
+from input_reader import open_input_file
+from form_fields import ADDITIONAL_TEXT_FIELDS, ADDITIONAL_CHECKBOX_FIELDS
+from pipeline import BatchPipeline
+from instrumentation import METRICS
+
+LOG_LIMIT = 2000  # Lines kept in the log view; older ones are dropped
+DRAIN_INTERVAL_MS = 100
+DRAIN_BATCH = 500  # Events handled per tick, so a burst can't block the main loop
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+
+class QueueLogHandler(logging.Handler):
+    """Forwards log records from any thread to the GUI's event queue."""
+
+    def __init__(self, events):
+        super().__init__()
+        self.events = events
+
+    def emit(self, record):
+        try:
+            self.events.put(('log', record.levelno, self.format(record)))
+        except Exception:
+            self.handleError(record)
 
 class ModernGUI:
-    def __init__(self, root, scraper, pdf_filler):
+    def __init__(self, root, scraper, pdf_filler, pdf_workers=2):
         self.root = root
         self.scraper = scraper
         self.pdf_filler = pdf_filler
-        
+        self.pdf_workers = pdf_workers
+
+        # Worker threads only post to this queue; the Tk main loop drains it on a timer and touches the widgets
+        self.events = queue.Queue()
+        self.log_records = deque(maxlen=LOG_LIMIT)  # (level, message)
+        self.completed = 0
+        self.log_handler = QueueLogHandler(self.events)
+        logging.getLogger().addHandler(self.log_handler)
+
         style = Style(theme='superhero')
         self.root.title("Saccani Business License Scraper")
         self.root.geometry("1200x800")
@@ -42,6 +52,7 @@ class ModernGUI:
         self.yellow = "#FFFF00"
         
         self.create_widgets()
+        self.root.after(DRAIN_INTERVAL_MS, self.drain_events)
 
     def create_widgets(self):
         self.notebook = ttk.Notebook(self.root)
@@ -81,11 +92,26 @@ class ModernGUI:
         self.output_entry.grid(column=1, row=2, sticky=(tk.W, tk.E), pady=10)
         ttk.Button(file_frame_inner, text="Browse", command=self.browse_output, style='warning.TButton').grid(column=2, row=2, padx=10, pady=10)
 
+        ttk.Label(file_frame_inner, text="Output Mode:", font=("Arial", 12, "bold")).grid(column=0, row=3, sticky=tk.W, pady=10)
+        self.output_modes = {
+            "One PDF per account": ('per_account', None),
+            "One combined PDF": ('combined', None),
+            "Combined PDF per route": ('combined', 'Route #'),
+            "Combined PDF per salesperson": ('combined', 'Salesperson'),
+        }
+        self.output_mode_var = tk.StringVar(value="One PDF per account")
+        ttk.Combobox(file_frame_inner, textvariable=self.output_mode_var, values=list(self.output_modes), state='readonly',
+                     width=30, font=("Arial", 12)).grid(column=1, row=3, sticky=tk.W, pady=10)
+
+        self.resume_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(file_frame_inner, text="Resume previous run (skip accounts whose PDF is already in the output folder)",
+                        variable=self.resume_var, style='success.TCheckbutton').grid(column=1, row=4, sticky=tk.W, pady=5)
+
         self.start_button = ttk.Button(file_frame_inner, text="Start Scraping", command=self.start_scraping, style='success.TButton')
-        self.start_button.grid(column=1, row=3, pady=20)
+        self.start_button.grid(column=1, row=5, pady=20)
 
         self.progress = ttk.Progressbar(file_frame_inner, orient=tk.HORIZONTAL, length=500, mode='determinate', style='warning.Horizontal.TProgressbar')
-        self.progress.grid(column=0, row=4, columnspan=3, sticky=(tk.W, tk.E), pady=10)
+        self.progress.grid(column=0, row=6, columnspan=3, sticky=(tk.W, tk.E), pady=10)
 
     def create_manual_entry_widgets(self):
         manual_frame = ttk.Frame(self.manual_entry_frame, style='TFrame', padding="10 10 10 10")
@@ -119,11 +145,7 @@ class ModernGUI:
         self.additional_info = {}
 
         # Text fields
-        text_fields = [
-            "Old Account #", "Old DBA Name", "Account Number for Changes only", 
-            "Buyer", "Receiving Times", "Special Instructions", "Phone Number",
-            "Route #", "Salesperson", "Account Number"
-        ]
+        text_fields = ADDITIONAL_TEXT_FIELDS
 
         for i, field in enumerate(text_fields):
             row = i // 2
@@ -138,35 +160,7 @@ class ModernGUI:
         checkbox_frame = ttk.Frame(additional_frame, style='TFrame', padding="10 10 10 10")
         checkbox_frame.grid(column=0, row=len(text_fields)//2 + 1, columnspan=4, sticky=(tk.W, tk.E))
 
-        self.checkbox_fields = {
-            "New Account": "New Account",
-            "Close Account": "Close Account",
-            "Change or Add Info": "Change or Add Info",
-            "Delivery Location Front": "Delivery Location Front",
-            "Delivery Location Back": "Delivery Location Back",
-            "Delivery Location Side": "Delivery Location Side",
-            "Monday": "Monday",
-            "Tuesday": "Tuesday",
-            "Wednesday": "Wednesday",
-            "Thursday": "Thursday",
-            "Friday": "Friday",
-            "Credit Application Yes": "Credit Application Yes",
-            "Credit Application No": "Credit Application No",
-            "On Sale": "On Sale",
-            "Off-Sale": "Off-Sale",
-            "Draft Status Ours": "Draft Status Ours",
-            "Draft Status Theirs": "Draft Status Theirs",
-            "Draft Status Ours & Theirs": "Draft Status Ours & Theirs",
-            "Draft Status Other": "Draft Status Other",
-            "Market Type Bar": "Market Type Bar",
-            "Market Type Restaurant": "Market Type Restaurant",
-            "Market Type Grocery": "Market Type Grocery",
-            "Market Type Deli": "Market Type Deli",
-            "Market Type Convenience": "Market Type Convenience",
-            "Market Type Other": "Market Type Other",
-            "Buying Yes": "Buying Yes",
-            "Buying No": "Buying No"
-        }
+        self.checkbox_fields = ADDITIONAL_CHECKBOX_FIELDS
 
         for i, (field_name, checkbox_text) in enumerate(self.checkbox_fields.items()):
             var = tk.StringVar(value="Off")
@@ -183,6 +177,15 @@ class ModernGUI:
         log_frame_inner = ttk.Frame(self.log_frame, style='TFrame', padding="10 10 10 10")
         log_frame_inner.pack(fill=tk.BOTH, expand=True)
 
+        filter_frame = ttk.Frame(log_frame_inner, style='TFrame')
+        filter_frame.pack(side=tk.TOP, fill=tk.X, pady=(0, 5))
+        ttk.Label(filter_frame, text="Show:", font=("Arial", 12, "bold")).pack(side=tk.LEFT)
+        self.log_level_var = tk.StringVar(value="INFO")
+        level_box = ttk.Combobox(filter_frame, textvariable=self.log_level_var, values=LOG_LEVELS, state='readonly', width=10, font=("Arial", 12))
+        level_box.pack(side=tk.LEFT, padx=5)
+        level_box.bind("<<ComboboxSelected>>", lambda event: self.refresh_log_view())
+        self.log_level = logging.INFO
+
         self.log_text = tk.Text(log_frame_inner, wrap=tk.WORD, width=100, height=20, bg=self.blue, fg=self.yellow, font=("Arial", 12))
         self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar = ttk.Scrollbar(log_frame_inner, orient="vertical", command=self.log_text.yview)
@@ -240,83 +243,141 @@ class ModernGUI:
             messagebox.showerror("Error", "Please fill in all fields")
             return
 
+        # Everything the batch needs from the widgets is read here, on the Tk thread
+        manual_accounts = []
+        for item in self.manual_accounts_list.get(0, tk.END):
+            account, client, city = item.split(" - ")
+            manual_accounts.append({"Account #": account, "Client": client, "City": city})
+        settings = {
+            'output_mode': self.output_modes[self.output_mode_var.get()],
+            'resume': self.resume_var.get(),
+            'additional_info': self.collect_additional_info(),
+        }
+
         self.start_button.config(state=tk.DISABLED)
-        threading.Thread(target=self.scrape_businesses, args=(input_file, template_file, output_folder), daemon=True).start()
+        self.completed = 0
+        self.progress['value'] = 0
+        threading.Thread(target=self.scrape_businesses, args=(input_file, template_file, output_folder, manual_accounts, settings),
+                         daemon=True).start()
 
-    def scrape_businesses(self, input_file, template_file, output_folder):
+    def scrape_businesses(self, input_file, template_file, output_folder, manual_accounts, settings):
         try:
-            businesses = []
-            if input_file:
-                businesses = read_input_file(input_file)
-            
-            # Add manually entered accounts
-            for item in self.manual_accounts_list.get(0, tk.END):
-                account, client, city = item.split(" - ")
-                businesses.append({"Account #": account, "Client": client, "City": city})
+            # Rows are read lazily, so the first lookup starts before the whole file is parsed
+            METRICS.reset()  # The run report covers driver startup as well as the batch
+            total, businesses = open_input_file(input_file) if input_file else (0, iter(()))
+            businesses = itertools.chain(businesses, manual_accounts)
 
             self.scraper.setup_driver()
-            self.progress['maximum'] = len(businesses)
-
-            for i, business in enumerate(businesses):
-                try:
-                    client = business.get('Client', 'Unknown')
-                    city = business.get('City', 'Unknown')
-                    account_number = business.get('Account #', '')
-                    self.log(f"Processing {client} in {city}")
-                    
-                    account_data = self.scraper.scrape_business(client, city)
-                    self.log(f"Scraped data: {account_data}")
-                    
-                    if account_data:
-                        account_data['ACCOUNT_NUMBER'] = account_number
-                        
-                        # Add additional info to account_data
-                        for field, info in self.additional_info.items():
-                            if isinstance(info, dict):  # It's a checkbox
-                                account_data[field] = info['var'].get()
-                            else:  # It's a text field
-                                account_data[field] = info.get()
-                        
-                        # Extract address components
-                        self.log("Extracting address components")
-                        street, city, state, zip_code = self.pdf_filler.extract_address_components(account_data.get('BUSINESS_ADDRESS', ''))
-                        account_data['STREET'] = street
-                        account_data['CITY'] = city
-                        account_data['STATE'] = state
-                        account_data['ZIP_CODE'] = zip_code
-                        
-                        # Debug print
-                        self.log("Account data before PDF filling:")
-                        for key, value in account_data.items():
-                            self.log(f"{key}: {value}")
-                        
-                        self.log("Calling fill_pdf method")
-                        pdf_path = self.pdf_filler.fill_pdf(account_data, template_file, output_folder)
-                        self.log(f"PDF saved: {pdf_path}")
-                    else:
-                        self.log(f"No data found for {client}")
-                    self.progress['value'] = i + 1
-                    self.root.update_idletasks()
-                except Exception as e:
-                    self.log(f"Error processing business {client}: {str(e)}")
-                    import traceback
-                    self.log(traceback.format_exc())
-                    continue
-
+            self.events.put(('maximum', (total or 0) + len(manual_accounts)))  # Grows as rows arrive when the count is unknown
+
+            # Scraping and PDF rendering run as separate stages so network waits and rendering overlap
+            output_mode, group_by = settings['output_mode']
+            pipeline = BatchPipeline(self.scraper, self.pdf_filler, pdf_workers=self.pdf_workers, output_mode=output_mode, group_by=group_by,
+                                     resume=settings['resume'])
+            pipeline.run(businesses, template_file, output_folder, settings['additional_info'], on_event=self.on_pipeline_event)
+            self.log(pipeline.duplicates.summary())
+            if pipeline.skipped:
+                self.log(f"{pipeline.skipped} accounts skipped, their PDFs were already up to date")
+            for path in pipeline.combined_paths:
+                self.log(f"Combined PDF saved: {path}")
+
+            for outcome, latency in self.scraper.outcome_latency_summary().items():
+                self.log(f"Search outcome '{outcome}': {latency['count']} times, mean {latency['mean']:.2f}s, max {latency['max']:.2f}s")
             self.scraper.close_driver()
+            cache = getattr(self.scraper, 'cache', None)
+            if cache:
+                self.log(cache.stats_summary())
+            license_store = getattr(self.scraper, 'license_store', None)
+            if license_store:
+                self.log(license_store.stats_summary())
+            search_strategy = getattr(self.scraper, 'search_strategy', None)
+            if search_strategy:
+                for line in search_strategy.hit_rate_report():
+                    self.log(f"Search variant hit rate: {line}")
             self.log("Scraping completed")
         except Exception as e:
-            self.log(f"Error during scraping: {str(e)}")
+            self.log(f"Error during scraping: {str(e)}", logging.ERROR)
             import traceback
-            self.log(traceback.format_exc())
+            self.log(traceback.format_exc(), logging.ERROR)
         finally:
-            self.start_button.config(state=tk.NORMAL)
+            self.events.put(('finished',))
+
+    def collect_additional_info(self):
+        # Snapshot of the Additional Info tab, taken once per batch
+        values = {}
+        for field, info in self.additional_info.items():
+            if isinstance(info, dict):  # It's a checkbox
+                values[field] = info['var'].get()
+            else:  # It's a text field
+                values[field] = info.get()
+        return values
+
+    def on_pipeline_event(self, kind, index, business, detail):
+        client = business.get('Client', 'Unknown')
+        # Called from the scrape and PDF stages; only posts to the event queue
+        if kind == 'scraped':
+            self.log(f"Scraped data for {client} in {business.get('City', 'Unknown')}: {detail}", logging.DEBUG)
+            return
+        if kind == 'pdf_written':
+            self.log(f"PDF saved: {detail}")
+        elif kind == 'skipped':
+            self.log(f"Skipping {client}, already done: {detail}")
+        elif kind == 'no_data':
+            self.log(f"No data found for {client}", logging.WARNING)
+        else:
+            self.log(f"Error processing business {client}: {detail}", logging.ERROR)
+        self.events.put(('progress',))
 
-    def log(self, message):
-        print(message)
-        self.log_text.insert(tk.END, message + "\n")
+    def log(self, message, level=logging.INFO):
+        # Safe from any thread
+        self.events.put(('log', level, message))
+
+    def drain_events(self):
+        # Runs on the Tk main loop: applies queued events in one batch, then reschedules itself
+        lines = []
+        progress = 0
+        try:
+            for _ in range(DRAIN_BATCH):
+                event = self.events.get_nowait()
+                if event[0] == 'log':
+                    _, level, message = event
+                    print(message)
+                    self.log_records.append((level, message))
+                    if level >= self.log_level:
+                        lines.append(message)
+                elif event[0] == 'progress':
+                    progress += 1
+                elif event[0] == 'maximum':
+                    self.progress['maximum'] = event[1]
+                elif event[0] == 'finished':
+                    self.start_button.config(state=tk.NORMAL)
+        except queue.Empty:
+            pass
+
+        if lines:
+            self.append_log_lines(lines)
+        if progress:
+            self.completed += progress
+            if self.completed > self.progress['maximum']:
+                self.progress['maximum'] = self.completed
+            self.progress['value'] = self.completed
+        self.root.after(DRAIN_INTERVAL_MS, self.drain_events)
+
+    def append_log_lines(self, lines):
+        self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+        # Keep the widget at LOG_LIMIT lines; the Text's line count includes the trailing empty line
+        excess = int(self.log_text.index('end-1c').split('.')[0]) - 1 - LOG_LIMIT
+        if excess > 0:
+            self.log_text.delete('1.0', f'{excess + 1}.0')
         self.log_text.see(tk.END)
-        self.root.update_idletasks()
+
+    def refresh_log_view(self):
+        # Re-render the kept lines at the newly selected level
+        self.log_level = getattr(logging, self.log_level_var.get())
+        self.log_text.delete('1.0', tk.END)
+        lines = [message for level, message in self.log_records if level >= self.log_level]
+        if lines:
+            self.append_log_lines(lines)
 
     def on_checkbox_click(self, field_name):
         checkbox_info = self.additional_info[field_name]
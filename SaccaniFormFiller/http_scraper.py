@@ -0,0 +1,152 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+import requests
+import license_parser
+from instrumentation import timer, count
+
+ABC_BASE_URL = "https://www.abc.ca.gov"
+SEARCH_PATH = "/licensing/license-lookup/business-name/"
+SINGLE_LICENSE_PATH = "/licensing/license-lookup/single-license/?RPTTYPE=12&LICENSE={}"
+
+class BrowserRequired(Exception):
+    """Raised when a page can't be handled from its raw HTML and needs the Selenium path."""
+
+class HttpLicenseClient:
+    """Plain requests/lxml version of the ABC license lookup used before falling back to Chrome."""
+
+    def __init__(self, base_url=ABC_BASE_URL, timeout=10, throttle=None, cache=None, chain_index=None, max_chain_depth=10, license_fields=None,
+                 on_ambiguous=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.throttle = throttle
+        self.cache = cache
+        self.chain_index = chain_index
+        self.max_chain_depth = max_chain_depth
+        self.license_fields = license_fields or license_parser.LICENSE_FIELDS
+        self.on_ambiguous = on_ambiguous  # Called with (city, candidates, page_url) when several rows match
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = "Mozilla/5.0 (SaccaniFormFiller)"
+
+    def fetch(self, url, method='GET', data=None):
+        if self.throttle:
+            self.throttle()
+        with timer('http.fetch'):
+            if method == 'POST':
+                response = self.session.post(url, data=data, timeout=self.timeout)
+            else:
+                response = self.session.get(url, params=data, timeout=self.timeout)
+            response.raise_for_status()
+        with timer('http.parse'):
+            return license_parser.parse_page(response.content), response.url
+
+    def search_and_scrape(self, business_name, city):
+        tree, url = self.submit_search(business_name)
+
+        if license_parser.is_details_page(tree):
+            return self.follow_license_chain(tree)
+        if license_parser.has_results_table(tree):
+            return self.pick_city_result(tree, url, city)
+        if license_parser.is_no_results_page(tree):
+            logging.info(f"No results found for '{business_name}'")
+            return None
+        raise BrowserRequired(f"Unrecognized search response for '{business_name}'")
+
+    def submit_search(self, business_name):
+        search_url = urljoin(self.base_url, SEARCH_PATH)
+        page, page_url = self.fetch(search_url)
+        inputs = page.xpath("//input[@id='BusinessName']")
+        forms = inputs[0].xpath("ancestor::form[1]") if inputs else []
+        if not forms:
+            raise BrowserRequired("Business name search form not found")
+
+        form = forms[0]
+        # Carry over hidden fields (tokens, report type) exactly as the browser would submit them
+        payload = {field.get('name'): field.get('value', '') for field in form.xpath(".//input[@name]")
+                   if field.get('type', 'text').lower() not in ('submit', 'button', 'checkbox', 'radio')}
+        payload[inputs[0].get('name') or 'BusinessName'] = business_name
+        action = urljoin(page_url, form.get('action') or page_url)
+        return self.fetch(action, form.get('method', 'GET').upper(), payload)
+
+    def pick_city_result(self, tree, url, city):
+        rows = license_parser.parse_results_table(tree)
+        if not rows:
+            # The table body is filled in by JavaScript on some result pages
+            raise BrowserRequired("Results table has no server-rendered rows")
+
+        candidates = license_parser.rank_candidates(rows, city)
+        if not candidates:
+            return None
+        if self.on_ambiguous and len(candidates) > 1:
+            self.on_ambiguous(city, candidates, url)
+        tree, _ = self.fetch(urljoin(url, candidates[0]['href']))
+        return self.follow_license_chain(tree)
+
+    def fetch_candidates(self, rows, page_url, max_workers=4):
+        # Details for every candidate row at once, for reporting ambiguous city searches
+        def fetch_details(row):
+            try:
+                tree, _ = self.fetch(urljoin(page_url, row['href']))
+                return license_parser.parse_license_details(tree, self.license_fields)
+            except requests.RequestException as e:
+                logging.error(f"Error fetching candidate license {row['license_number']}: {str(e)}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(fetch_details, rows))
+
+    def fetch_license(self, license_number, visited=None):
+        if self.cache:
+            found, cached = self.cache.get_license(license_number)
+            if found and cached:
+                logging.info(f"Cache hit for license {license_number}")
+                return cached
+        tree, _ = self.fetch(urljoin(self.base_url, SINGLE_LICENSE_PATH.format(license_number)))
+        return self.follow_license_chain(tree, visited)
+
+    def follow_license_chain(self, tree, visited=None):
+        visited = visited if visited is not None else []
+        status = license_parser.parse_license_status(tree)
+        license_number = license_parser.first_text(tree, license_parser.LICENSE_FIELD_XPATHS['LICENSE_NUMBER']) or ""
+        if license_number:
+            visited.append(license_number)
+
+        if status == "ACTIVE":
+            logging.info("Found active license. Extracting details.")
+            with timer('license.extract_fields'):
+                return license_parser.parse_license_details(tree, self.license_fields)
+        elif status == "CANCELED":
+            if len(visited) > self.max_chain_depth:
+                logging.warning(f"License chain exceeds {self.max_chain_depth} hops: {' -> '.join(visited)}")
+                return None
+
+            # Jump straight to the end of a chain we have already walked
+            shortcut = self.chain_index.shortcut(license_number, visited) if self.chain_index and license_number else None
+            if shortcut:
+                logging.info(f"Known transfer chain {license_number} -> {shortcut}, skipping intermediate licenses.")
+                return self.fetch_license(shortcut, visited)
+
+            new_license_number, href = license_parser.parse_transfer_link(tree)
+            if not href:
+                logging.error("Canceled license has no transfer link")
+                return None
+            logging.info(f"Found new license number: {new_license_number}")
+            if self.chain_index and license_number:
+                self.chain_index.record_transfer(license_number, new_license_number)
+            if new_license_number in visited:
+                logging.warning(f"License transfer cycle detected: {' -> '.join(visited + [new_license_number])}")
+                return None
+            if self.cache:
+                found, cached = self.cache.get_license(new_license_number)
+                if found and cached:
+                    logging.info(f"Cache hit for license {new_license_number}")
+                    return cached
+            count('license.transfers')
+            with timer('license.chain_hop'):
+                tree, _ = self.fetch(urljoin(self.base_url, href))
+            return self.follow_license_chain(tree, visited)
+        elif status is None:
+            raise BrowserRequired("License details page has no status field")
+        else:
+            logging.warning(f"Unexpected license status: {status}")
+            return None
@@ -0,0 +1,110 @@
+import csv
+import itertools
+import os
+
+# Readers yield one normalized record at a time so scraping can start on the first row.
+# Format libraries are imported by the reader that needs them.
+
+def normalize_record(record):
+    # Header and cell padding from the account exports ("Client ", "CITRUS HEIGHTS ") is stripped here
+    normalized = {}
+    for key, value in record.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        elif value is None or value != value:  # Empty cell or NaN
+            value = ''
+        normalized[str(key).strip()] = value
+    return normalized
+
+def is_blank(record):
+    return all(value == '' for value in record.values())
+
+def iter_csv(file_path):
+    with open(file_path, 'r', newline='', encoding='utf-8-sig', errors='replace') as file:
+        for row in csv.DictReader(file):
+            record = normalize_record(row)
+            if not is_blank(record):
+                yield record
+
+def iter_xlsx(file_path):
+    import openpyxl
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = next(rows, None)
+        if headers is None:
+            return
+        headers = ['' if header is None else header for header in headers]
+        for row in rows:
+            record = normalize_record(dict(zip(headers, row)))
+            if not is_blank(record):
+                yield record
+    finally:
+        workbook.close()
+
+def iter_xls(file_path):
+    # openpyxl can't read the legacy format, so .xls still goes through pandas
+    import pandas as pd
+    for row in pd.read_excel(file_path).to_dict('records'):
+        record = normalize_record(row)
+        if not is_blank(record):
+            yield record
+
+def iter_docx(file_path):
+    import docx
+    doc = docx.Document(file_path)
+    lines = (para.text for para in doc.paragraphs if para.text.strip())
+    headers = next(lines, None)
+    if headers is None:
+        return
+    headers = headers.split(',')
+    for line in lines:
+        yield normalize_record(dict(zip(headers, line.split(','))))
+
+READERS = {
+    '.csv': iter_csv,
+    '.txt': iter_csv,
+    '.xlsx': iter_xlsx,
+    '.xls': iter_xls,
+    '.docx': iter_docx,
+}
+
+def iter_records(file_path):
+    _, file_extension = os.path.splitext(file_path)
+    reader = READERS.get(file_extension.lower())
+    if reader is None:
+        raise ValueError(f"Unsupported file type: {file_extension}")
+    return reader(file_path)
+
+def count_records(file_path):
+    # Row count for the progress bar where it is cheap to get, otherwise None
+    _, file_extension = os.path.splitext(file_path)
+    file_extension = file_extension.lower()
+    if file_extension in ('.csv', '.txt'):
+        # Counting newlines is far cheaper than parsing; quoted multi-line cells make it an estimate
+        lines = 0
+        last_byte = b''
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                lines += chunk.count(b'\n')
+                last_byte = chunk[-1:]
+        if last_byte and last_byte != b'\n':
+            lines += 1  # Last line without a trailing newline
+        return max(lines - 1, 0)
+    if file_extension == '.xlsx':
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            max_row = workbook.active.max_row  # From the sheet's stored dimensions, no row parsing
+        finally:
+            workbook.close()
+        return max(max_row - 1, 0) if max_row else None
+    return None
+
+def open_input_file(file_path):
+    return count_records(file_path), iter_records(file_path)
+
+def read_input_file(file_path, limit=None):
+    return list(itertools.islice(iter_records(file_path), limit))
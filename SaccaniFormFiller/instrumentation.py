@@ -0,0 +1,119 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+RUN_REPORT_NAME = "run_report.json"
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+class Metrics:
+    """Per-run timings and counters, shared by every thread in the process.
+
+    Timings are kept raw so the report can give exact p50/p95/max; a 10k-row batch
+    records a few hundred thousand floats at most.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = {}  # name -> [seconds]
+        self.counters = {}  # name -> count
+        self.started = time.time()
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self.lock:
+            if name in self.timings:
+                self.timings[name].append(seconds)
+            else:
+                self.timings[name] = [seconds]
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        with self.lock:
+            self.timings = {}
+            self.counters = {}
+            self.started = time.time()
+
+    def _after_fork(self):
+        # A forked child inherits the lock in whatever state a parent thread left it; never take it, replace it
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.counters = {}
+        self.started = time.time()
+
+    def drain(self):
+        # Hand everything recorded so far to the caller and start over; used to ship PDF worker timings back
+        with self.lock:
+            drained = {'timings': self.timings, 'counters': self.counters}
+            self.timings = {}
+            self.counters = {}
+        return drained
+
+    def merge(self, drained):
+        with self.lock:
+            for name, values in drained.get('timings', {}).items():
+                self.timings.setdefault(name, []).extend(values)
+            for name, amount in drained.get('counters', {}).items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self):
+        with self.lock:
+            timings = {name: sorted(values) for name, values in self.timings.items()}
+            counters = dict(self.counters)
+        return {
+            'started': self.started,
+            'elapsed_seconds': round(time.time() - self.started, 3),
+            'timings': {name: {
+                'count': len(values),
+                'total': round(sum(values), 4),
+                'p50': round(percentile(values, 0.50), 4),
+                'p95': round(percentile(values, 0.95), 4),
+                'max': round(values[-1], 4),
+            } for name, values in sorted(timings.items()) if values},
+            'counters': dict(sorted(counters.items())),
+        }
+
+    def summary_lines(self, report=None, limit=8):
+        # Where the time went: the stages with the most total time, then every counter
+        report = report or self.report()
+        stages = sorted(report['timings'].items(), key=lambda item: item[1]['total'], reverse=True)
+        lines = [f"{name}: {stats['count']}x, total {stats['total']:.1f}s, p50 {stats['p50'] * 1000:.0f}ms, "
+                 f"p95 {stats['p95'] * 1000:.0f}ms, max {stats['max'] * 1000:.0f}ms" for name, stats in stages[:limit]]
+        if report['counters']:
+            lines.append(", ".join(f"{name} {value}" for name, value in report['counters'].items()))
+        return lines
+
+    def write_report(self, path):
+        report = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Run report written to {path}")
+        for line in self.summary_lines(report):
+            logging.info(f"Timing: {line}")
+        return report
+
+# One set per process: scrapers, fillers and the pipeline record here without passing it around
+METRICS = Metrics()
+timer = METRICS.timer
+count = METRICS.count
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=METRICS._after_fork)
@@ -0,0 +1,58 @@
+import logging
+import threading
+import time
+from lookup_cache import DEFAULT_CACHE_PATH, connect_database
+
+class LicenseChainIndex:
+    """Persistent map of canceled license -> license it was transferred to, used to skip known hops."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_depth=10):
+        self.path = path
+        self.max_depth = max_depth
+        self.lock = threading.Lock()
+
+        self.conn = connect_database(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS license_transfers (license TEXT PRIMARY KEY, transferred_to TEXT NOT NULL, recorded_at REAL NOT NULL)")
+        self.conn.commit()
+        # The whole index is a few thousand short strings, so resolve() walks an in-memory dict
+        self.transfers = dict(self.conn.execute("SELECT license, transferred_to FROM license_transfers"))
+
+    def record_transfer(self, license_number, transferred_to):
+        license_number, transferred_to = license_number.strip(), transferred_to.strip()
+        if not license_number or not transferred_to or license_number == transferred_to:
+            return
+        with self.lock:
+            if self.transfers.get(license_number) == transferred_to:
+                return
+            self.transfers[license_number] = transferred_to
+            self.conn.execute("INSERT OR REPLACE INTO license_transfers (license, transferred_to, recorded_at) VALUES (?, ?, ?)",
+                              (license_number, transferred_to, time.time()))
+            self.conn.commit()
+
+    def resolve(self, license_number):
+        # Follows known transfers to the last license we have seen; None if nothing is known or the chain loops
+        license_number = license_number.strip()
+        seen = [license_number]
+        current = license_number
+        with self.lock:
+            while current in self.transfers:
+                current = self.transfers[current]
+                if current in seen:
+                    logging.warning(f"License transfer cycle detected: {' -> '.join(seen + [current])}")
+                    return None
+                seen.append(current)
+                if len(seen) > self.max_depth:
+                    logging.warning(f"License transfer chain from {license_number} exceeds {self.max_depth} hops")
+                    return None
+        return current if current != license_number else None
+
+    def shortcut(self, license_number, visited):
+        # The license to jump to from a canceled page, or None when we must follow the transfer link
+        final = self.resolve(license_number)
+        if final and final not in visited:
+            return final
+        return None
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
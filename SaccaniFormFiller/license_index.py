@@ -0,0 +1,122 @@
+import re
+import threading
+import time
+from collections import Counter
+from lookup_cache import DEFAULT_CACHE_PATH, connect_database
+from normalize import normalize_text
+
+# Words that vary between our account names and ABC records without identifying the business
+NOISE_TOKENS = {'the', 'inc', 'llc', 'co', 'corp', 'dba', 'cod', 'store'}
+PUNCTUATION = re.compile(r'[^\w\s]')
+
+def name_tokens(name):
+    tokens = PUNCTUATION.sub(' ', normalize_text(name)).split()
+    return [token for token in tokens if token not in NOISE_TOKENS]
+
+def number_tokens(name):
+    # Store numbers and the like, e.g. "#9876" or "05432"
+    return {token for token in name_tokens(name) if any(c.isdigit() for c in token)}
+
+def trigrams(name):
+    text = f"  {' '.join(name_tokens(name))} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def similarity(query_gram_count, entry_gram_count, shared):
+    # Dice coefficient over trigram sets
+    total = query_gram_count + entry_gram_count
+    return 2.0 * shared / total if total else 0.0
+
+class LicenseMatchIndex:
+    """Trigram index of names we have already resolved to a license, per city.
+
+    Lets an incoming Client/City be matched locally before the scraper searches the site.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, threshold=0.85):
+        self.path = path
+        self.threshold = threshold  # Matches at or above this skip the name search
+        self.lock = threading.Lock()
+        self.entries = []  # (license number, name, trigram count)
+        self.known = set()  # (name key, city key, license number) already indexed
+        self.postings = {}  # city key -> trigram -> entry ids
+        self.loaded = False  # Entries are read on first use rather than while the app starts
+
+        self.conn = connect_database(path)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS license_names (
+            name_key TEXT NOT NULL, city_key TEXT NOT NULL, license_number TEXT NOT NULL,
+            name TEXT NOT NULL, recorded_at REAL NOT NULL,
+            PRIMARY KEY (name_key, city_key, license_number))""")
+        self.conn.commit()
+
+    def _load(self):
+        # Caller holds self.lock
+        if self.loaded:
+            return
+        for name_key, city_key, license_number, name in self.conn.execute("SELECT name_key, city_key, license_number, name FROM license_names"):
+            self._index(name_key, city_key, license_number, name)
+        self.loaded = True
+
+    def _index(self, name_key, city_key, license_number, name):
+        key = (name_key, city_key, license_number)
+        if key in self.known:
+            return False
+        self.known.add(key)
+        entry_id = len(self.entries)
+        grams = trigrams(name_key)
+        self.entries.append((license_number, name, len(grams)))
+        city_postings = self.postings.setdefault(city_key, {})
+        for gram in grams:
+            if gram in city_postings:
+                city_postings[gram].append(entry_id)
+            else:
+                city_postings[gram] = [entry_id]
+        return True
+
+    def add(self, name, city, license_number):
+        if not name or not license_number or license_number in ("Not found", "Error"):
+            return
+        name_key, city_key = normalize_text(name), normalize_text(city)
+        with self.lock:
+            self._load()
+            if self._index(name_key, city_key, license_number, name):
+                self.conn.execute("INSERT OR IGNORE INTO license_names (name_key, city_key, license_number, name, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                                  (name_key, city_key, license_number, name, time.time()))
+                self.conn.commit()
+
+    def add_result(self, business_name, city, account_data):
+        # Index both our spelling of the client and the name ABC has on file
+        license_number = account_data.get('LICENSE_NUMBER')
+        self.add(business_name, city, license_number)
+        self.add(account_data.get('BUSINESS_NAME'), city, license_number)
+
+    def matches(self, name, city, limit=3):
+        # [(score, license number, indexed name)] best first, only entries in the same city
+        city_key = normalize_text(city)
+        query_grams = trigrams(name)
+        with self.lock:
+            self._load()
+            city_postings = self.postings.get(city_key, {})
+            shared = Counter()
+            for gram in query_grams:
+                shared.update(city_postings.get(gram, ()))
+            scored = []
+            for entry_id, count in shared.items():
+                license_number, entry_name, entry_gram_count = self.entries[entry_id]
+                scored.append((similarity(len(query_grams), entry_gram_count, count), license_number, entry_name))
+        scored.sort(reverse=True)
+        return scored[:limit]
+
+    def best_match(self, name, city):
+        # The license number of a confident match, or None.
+        # Numbers must agree exactly: "CVS PHARMACY #9877" scores 0.89 against #9876 but is another store's license
+        numbers = number_tokens(name)
+        matches = [match for match in self.matches(name, city, limit=5) if number_tokens(match[2]) == numbers]
+        if not matches or matches[0][0] < self.threshold:
+            return None
+        if len(matches) > 1 and matches[1][1] != matches[0][1] and matches[1][0] >= matches[0][0] - 0.02:
+            return None  # Two different licenses look equally right; let the site decide
+        return matches[0][1]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,111 @@
+import re
+from lxml import html
+from normalize import normalize_text
+
+# Declarative field map: ('dt', label) reads the <dd> after a matching <dt>, ('h2', label) the <p> after a matching <h2>.
+# Add entries here (or pass a copy to parse_license_details) to pull more fields off the details page.
+LICENSE_FIELDS = {
+    'LICENSE_NUMBER': ('dt', 'License Number:'),
+    'PRIMARY_OWNER': ('dt', 'Primary Owner:'),
+    'BUSINESS_NAME': ('h2', 'Business Name'),
+    'BUSINESS_ADDRESS': ('h2', 'Business Address'),
+    'COUNTY': ('dt', 'County:'),
+    'LICENSE_TYPE_STATUS': ('dt', 'License Type Status:'),
+}
+
+VALUE_TAGS = {'dt': 'dd', 'h2': 'p'}
+
+def field_xpath(tag, label):
+    return f"//{tag}[contains(text(), '{label}')]/following-sibling::{VALUE_TAGS[tag]}[1]"
+
+# The same fields as one XPath each, for the per-element Selenium extraction mode
+LICENSE_FIELD_XPATHS = {key: field_xpath(tag, label) for key, (tag, label) in LICENSE_FIELDS.items()}
+
+STATUS_XPATH = LICENSE_FIELD_XPATHS['LICENSE_TYPE_STATUS']
+TRANSFER_LINK_XPATH = "//dt[contains(text(), 'Transfers:')]/following-sibling::dd[1]//a[contains(@href, '/licensing/license-lookup/single-license/?RPTTYPE=12&LICENSE=')]"
+RESULT_ROWS_XPATH = "//table[@id='abc_licenses']//tr[td]"
+NO_RESULTS_PATTERN = re.compile(r'no (results|records|matching records|licenses) (were )?found', re.IGNORECASE)
+
+def parse_page(page_source):
+    return html.fromstring(page_source)
+
+def element_text(element):
+    # Mimic Selenium's WebElement.text: <br> becomes a newline and runs of whitespace collapse.
+    # The text nodes and <br>s come back in document order, so the tree itself is never edited
+    pieces = element.xpath(".//text() | .//br")
+    text = "".join(piece if isinstance(piece, str) else "\n" for piece in pieces)
+    lines = [' '.join(line.split()) for line in text.split("\n")]
+    return "\n".join(line for line in lines if line)
+
+def clean_text(text):
+    return text.strip().encode('ascii', 'ignore').decode('ascii')  # Remove non-ASCII characters
+
+def first_text(tree, xpath):
+    elements = tree.xpath(xpath)
+    return element_text(elements[0]) if elements else None
+
+def is_details_page(tree):
+    return bool(tree.xpath(STATUS_XPATH))
+
+def has_results_table(tree):
+    return bool(tree.xpath("//table[@id='abc_licenses']"))
+
+def is_no_results_page(tree):
+    return bool(NO_RESULTS_PATTERN.search(tree.text_content()))
+
+def parse_license_status(tree):
+    status = first_text(tree, STATUS_XPATH)
+    return status.strip().upper() if status else None
+
+def parse_transfer_link(tree):
+    links = tree.xpath(TRANSFER_LINK_XPATH)
+    if not links:
+        return None, None
+    return element_text(links[0]), links[0].get('href')
+
+def extract_fields(tree, fields=LICENSE_FIELDS):
+    # One walk over the <dt>/<h2> labels instead of one XPath query per field
+    wanted = {}
+    for key, (tag, label) in fields.items():
+        wanted.setdefault(tag, []).append((key, label))
+
+    found = {}
+    for element in tree.iter(*wanted):
+        label_text = element.text or ""
+        for key, label in wanted[element.tag]:
+            if key not in found and label in label_text:
+                value = next(element.itersiblings(VALUE_TAGS[element.tag]), None)
+                if value is not None:
+                    found[key] = element_text(value)
+        if len(found) == len(fields):
+            break
+    return found
+
+def parse_license_details(tree, fields=LICENSE_FIELDS):
+    found = extract_fields(tree, fields)
+    return {key: clean_text(found[key]) if key in found else "Not found" for key in fields}
+
+def parse_results_table(tree):
+    rows = []
+    for row in tree.xpath(RESULT_ROWS_XPATH):
+        text = element_text(row)
+        links = row.xpath(".//a[@href]")
+        status_match = re.search(r'\((ACTIVE|PEND)\)', text)
+        rows.append({
+            'text': text,
+            'cells': [element_text(cell) for cell in row.xpath("./td")],
+            'status': status_match.group(1) if status_match else None,
+            'href': links[0].get('href') if links else None,
+            'license_number': element_text(links[0]) if links else None,
+        })
+    return rows
+
+def is_exact_city_match(row, city_key):
+    # The city is a whole cell, or a whole comma-separated part of one ("123 MAIN ST, AUBURN, CA")
+    return any(city_key == normalize_text(part) for cell in row['cells'] for part in re.split(r'[,\n]', cell))
+
+def rank_candidates(rows, city):
+    # ACTIVE/PEND rows mentioning the city: exact city matches first, then ACTIVE before PEND, then table order
+    city_key = normalize_text(city)
+    candidates = [row for row in rows if row['status'] and row['href'] and city_key in normalize_text(row['text'])]
+    return sorted(candidates, key=lambda row: (not is_exact_city_match(row, city_key), row['status'] != 'ACTIVE'))
@@ -0,0 +1,219 @@
+import argparse
+import csv
+import logging
+import os
+import threading
+import time
+from normalize import normalize_text
+from license_index import name_tokens
+from lookup_cache import connect_database
+from address import AddressNormalizer
+
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser('~'), '.saccani', 'license_store.sqlite3')
+BATCH_SIZE = 5000
+
+# Export header (case and spacing ignored) -> store column. Covers the ABC data file headers and plain exports.
+COLUMN_ALIASES = {
+    'license_number': ['license number', 'license no', 'license', 'lic number', 'file number', 'license_number'],
+    'business_name': ['dba name', 'dba', 'business name', 'doing business as', 'business_name'],
+    'primary_owner': ['primary owner', 'primary name', 'owner', 'licensee', 'primary_owner'],
+    'address': ['business address', 'premises address', 'address', 'business_address'],
+    'street': ['prem addr 1', 'prem street', 'premises street', 'street'],
+    'city': ['prem city', 'premises city', 'city'],
+    'state': ['prem state', 'premises state', 'state'],
+    'zip_code': ['prem zip', 'premises zip', 'zip', 'zip code', 'zip_code'],
+    'county': ['county', 'prem county', 'premises county'],
+    'status': ['license type status', 'type status', 'license status', 'status'],
+    'transfer_to': ['transfer to', 'transferred to', 'new license number', 'transfer_to'],
+}
+
+def name_key(name):
+    # Same normalization the trigram index uses: case, punctuation and filler words like INC/LLC don't count
+    return ' '.join(name_tokens(name or ''))
+
+def map_columns(header):
+    normalized = [normalize_text(column).replace('_', ' ') for column in header]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            alias = alias.replace('_', ' ')
+            if alias in normalized:
+                columns[field] = normalized.index(alias)
+                break
+    if 'license_number' not in columns or not ({'business_name', 'primary_owner'} & set(columns)):
+        raise ValueError(f"Export needs a license number and a business or owner name column, found: {', '.join(header)}")
+    return columns
+
+class LicenseStore:
+    """Local SQLite copy of a bulk license export, keyed by license number and by normalized DBA name + city.
+
+    The scraper asks here first; only misses and rows older than `max_age` go to the live site.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, max_age=30 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'ambiguous': 0}
+        self.conn = connect_database(path)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS licenses (
+            license_number TEXT PRIMARY KEY, name_key TEXT NOT NULL, city_key TEXT NOT NULL,
+            business_name TEXT, primary_owner TEXT, business_address TEXT, county TEXT,
+            status TEXT, transfer_to TEXT, imported_at REAL NOT NULL) WITHOUT ROWID""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS licenses_by_name ON licenses (name_key, city_key)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS store_info (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+
+    def ingest(self, file_path, delimiter=None, replace=False, encoding='utf-8-sig'):
+        # Streams the export in batches, so memory stays flat however large the file is
+        started = time.monotonic()
+        imported_at = time.time()
+        if delimiter is None:
+            delimiter = '\t' if os.path.splitext(file_path)[1].lower() in ('.tsv', '.tab') else ','
+        addresses = AddressNormalizer()  # City and county for exports that only have a full address column
+        with open(file_path, 'r', newline='', encoding=encoding, errors='replace') as f, self.lock:
+            reader = csv.reader(f, delimiter=delimiter)
+            columns = map_columns(next(reader, []))
+            self.conn.execute("PRAGMA synchronous = OFF")
+            try:
+                with self.conn:
+                    if replace:
+                        self.conn.execute("DELETE FROM licenses")
+                    # Rebuilding the name index once is much cheaper than maintaining it per row
+                    self.conn.execute("DROP INDEX IF EXISTS licenses_by_name")
+                    rows = 0
+                    batch = []
+                    for record in reader:
+                        row = self._row(record, columns, imported_at, addresses)
+                        if row is None:
+                            continue
+                        batch.append(row)
+                        if len(batch) >= BATCH_SIZE:
+                            self._insert(batch)
+                            rows += len(batch)
+                            batch = []
+                    self._insert(batch)
+                    rows += len(batch)
+                    self.conn.execute("CREATE INDEX licenses_by_name ON licenses (name_key, city_key)")
+                    self.conn.executemany("INSERT OR REPLACE INTO store_info (key, value) VALUES (?, ?)",
+                                          [('source', os.path.abspath(file_path)), ('imported_at', str(imported_at))])
+            finally:
+                self.conn.execute("PRAGMA synchronous = FULL")
+        logging.info(f"Imported {rows} licenses from {file_path} in {time.monotonic() - started:.1f}s")
+        return rows
+
+    def _insert(self, batch):
+        self.conn.executemany("""INSERT OR REPLACE INTO licenses (license_number, name_key, city_key, business_name, primary_owner,
+            business_address, county, status, transfer_to, imported_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", batch)
+
+    @staticmethod
+    def _row(record, columns, imported_at, addresses):
+        def value(field):
+            index = columns.get(field)
+            return record[index].strip() if index is not None and index < len(record) else ''
+
+        license_number = value('license_number')
+        if not license_number:
+            return None
+        business_name = value('business_name') or value('primary_owner')
+        city = value('city')
+        county = value('county')
+        address = value('address')
+        if not address:
+            # Same "STREET, CITY, STATE ZIP" shape as the site, so the pipeline splits both the same way
+            state_zip = ' '.join(part for part in (value('state') or 'CA', value('zip_code')) if part)
+            address = ', '.join(part for part in (value('street'), city, state_zip) if part)
+        if not city or not county:
+            parts = addresses.normalize(address)
+            city = city or parts['CITY']
+            county = county or parts['COUNTY']
+        return (license_number, name_key(business_name), normalize_text(city), business_name, value('primary_owner'),
+                address, county, value('status').upper(), value('transfer_to') or None, imported_at)
+
+    def _account_data(self, row):
+        license_number, business_name, primary_owner, address, county, status = row
+        return {
+            'LICENSE_NUMBER': license_number,
+            'PRIMARY_OWNER': primary_owner or "Not found",
+            'BUSINESS_NAME': business_name or "Not found",
+            'BUSINESS_ADDRESS': address or "Not found",
+            'COUNTY': county or "Not found",
+            'LICENSE_TYPE_STATUS': status or "Not found",
+        }
+
+    def _fresh(self, imported_at):
+        return not self.max_age or time.time() - imported_at <= self.max_age
+
+    def _follow(self, license_number, max_hops=10):
+        # (stats key, account data) for a license, following recorded transfers to the active one; caller holds the lock
+        for _ in range(max_hops + 1):
+            row = self.conn.execute("""SELECT license_number, business_name, primary_owner, business_address, county, status,
+                transfer_to, imported_at FROM licenses WHERE license_number = ?""", (license_number,)).fetchone()
+            if row is None:
+                return 'misses', None
+            if not self._fresh(row[7]):
+                return 'stale', None
+            if row[5] == 'ACTIVE':
+                return 'hits', self._account_data(row[:6])
+            if not row[6]:
+                return 'misses', None  # Canceled with no known successor; the site knows more
+            license_number = row[6]
+        return 'misses', None
+
+    def get_license(self, license_number, max_hops=10):
+        # Account data for a license, following recorded transfers to the active one; None on a miss or stale row
+        with self.lock:
+            outcome, account_data = self._follow(license_number, max_hops)
+            self.stats[outcome] += 1
+        return account_data
+
+    def find_business(self, business_name, city):
+        key = name_key(business_name)
+        if not key:
+            return None
+        with self.lock:
+            rows = self.conn.execute("""SELECT license_number, business_name, primary_owner, business_address, county, status,
+                transfer_to, imported_at FROM licenses WHERE name_key = ? AND city_key = ?""", (key, normalize_text(city))).fetchall()
+            active = [row for row in rows if row[5] == 'ACTIVE']
+            if not active:
+                successors = {row[6] for row in rows if row[6]}
+                outcome, account_data = self._follow(successors.pop()) if len(successors) == 1 else ('misses', None)
+            elif len(active) > 1:
+                outcome, account_data = 'ambiguous', None  # Several active licenses under one name in one city; let the site decide
+            elif not self._fresh(active[0][7]):
+                outcome, account_data = 'stale', None
+            else:
+                outcome, account_data = 'hits', self._account_data(active[0][:6])
+            # One lookup, one count, however many transfers it followed
+            self.stats[outcome] += 1
+        return account_data
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM licenses").fetchone()[0]
+
+    def stats_summary(self):
+        with self.lock:
+            stats = dict(self.stats)
+        return (f"License store: {stats['hits']} hits, {stats['misses']} misses, {stats['stale']} stale, "
+                f"{stats['ambiguous']} ambiguous")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a bulk ABC license export (CSV or TSV) into the local license store.")
+    parser.add_argument("export", help="License export file")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="License store file")
+    parser.add_argument("--delimiter", help="Field separator; defaults to a tab for .tsv files and a comma otherwise")
+    parser.add_argument("--replace", action="store_true", help="Drop every license already in the store first")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    store = LicenseStore(args.store)
+    store.ingest(args.export, delimiter=args.delimiter, replace=args.replace)
+    logging.info(f"{store.count()} licenses in {args.store}")
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from normalize import normalize_text
+from instrumentation import count
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.saccani', 'lookup_cache.sqlite3')
+BUSY_TIMEOUT = 30  # Seconds a write waits for another connection's write to finish
+
+def connect_database(path):
+    # LookupCache, LicenseChainIndex and LicenseMatchIndex each hold a connection to the same file and write from
+    # pool threads. WAL keeps readers and the writer out of each other's way, and the busy timeout makes a second
+    # writer wait instead of failing with "database is locked".
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode = WAL")
+    return conn
+
+class LookupCache:
+    """SQLite cache of ABC lookups keyed by normalized business name + city, or by license number."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=7 * 24 * 3600, negative_ttl=24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl  # "No results" entries expire sooner, new licenses show up
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'stale': 0, 'writes': 0}
+
+        self.conn = connect_database(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS lookups (key TEXT PRIMARY KEY, data TEXT, fetched_at REAL NOT NULL)")
+        self.conn.commit()
+
+    @staticmethod
+    def business_key(business_name, city):
+        return f"name:{normalize_text(business_name)}|{normalize_text(city)}"
+
+    @staticmethod
+    def license_key(license_number):
+        return f"license:{normalize_text(license_number)}"
+
+    def get(self, key):
+        # Returns (found, data); data is None for a cached negative result
+        with self.lock:
+            row = self.conn.execute("SELECT data, fetched_at FROM lookups WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                count('cache.misses')
+                return False, None
+            data, fetched_at = row
+            ttl = self.ttl if data is not None else self.negative_ttl
+            if time.time() - fetched_at > ttl:
+                self.stats['stale'] += 1
+                self.stats['misses'] += 1
+                count('cache.stale')
+                count('cache.misses')
+                return False, None
+            outcome = 'hits' if data is not None else 'negative_hits'
+            self.stats[outcome] += 1
+            count(f'cache.{outcome}')
+            return True, json.loads(data) if data is not None else None
+
+    def put(self, key, data):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO lookups (key, data, fetched_at) VALUES (?, ?, ?)",
+                              (key, json.dumps(data) if data is not None else None, time.time()))
+            self.conn.commit()
+            self.stats['writes'] += 1
+
+    def get_business(self, business_name, city):
+        return self.get(self.business_key(business_name, city))
+
+    def put_business(self, business_name, city, data):
+        self.put(self.business_key(business_name, city), data)
+
+    def get_license(self, license_number):
+        return self.get(self.license_key(license_number))
+
+    def put_license(self, license_number, data):
+        if license_number and license_number != "Not found":
+            self.put(self.license_key(license_number), data)
+
+    def purge_expired(self):
+        with self.lock:
+            now = time.time()
+            self.conn.execute("DELETE FROM lookups WHERE (data IS NOT NULL AND ? - fetched_at > ?) OR (data IS NULL AND ? - fetched_at > ?)",
+                              (now, self.ttl, now, self.negative_ttl))
+            self.conn.commit()
+
+    def stats_summary(self):
+        lookups = self.stats['hits'] + self.stats['negative_hits'] + self.stats['misses']
+        hit_rate = (self.stats['hits'] + self.stats['negative_hits']) / lookups * 100 if lookups else 0.0
+        return (f"Cache: {self.stats['hits']} hits, {self.stats['negative_hits']} negative hits, "
+                f"{self.stats['misses']} misses ({self.stats['stale']} stale), hit rate {hit_rate:.1f}%")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+        logging.info(self.stats_summary())
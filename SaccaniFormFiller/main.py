@@ -1,14 +1,81 @@
+import time
+STARTED = time.perf_counter()  # Before the app's imports, so --startup-time counts them
+
+import argparse
+import json
+import logging
+import multiprocessing
+import sys
 import tkinter as tk
 from gui import ModernGUI
-from scraper import BusinessScraper
+from scraper_pool import ScraperPool
 from pdf_filler import PDFFiller
+from lookup_cache import LookupCache
+from license_chain import LicenseChainIndex
+from license_index import LicenseMatchIndex
+from license_store import LicenseStore
+from search_strategy import SearchStrategy, DEFAULT_STATS_PATH
+
+IMPORTED = time.perf_counter()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Saccani Business License Scraper")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="Open the window, print how long each startup phase took as JSON, and exit")
+    parser.add_argument("--startup-target", type=float,
+                        help="With --startup-time, exit with status 1 if the window took longer than this many seconds")
+    # parse_known_args: the PyInstaller and multiprocessing bootstraps may pass their own arguments
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Everything reaches the GUI's handler, whose log view filters by the level picked there
+    logging.getLogger().setLevel(logging.DEBUG)
+    # Per-request chatter from these libraries would crowd our own records out of the view's buffer
+    for name in ('urllib3', 'selenium', 'asyncio', 'PIL'):
+        logging.getLogger(name).setLevel(logging.INFO)
+    phases = {'imports': IMPORTED - STARTED}
 
-def main():
+    phase_start = time.perf_counter()
     root = tk.Tk()
-    scraper = BusinessScraper()
+    # Nothing here launches Chrome or opens a template; that waits for the first batch
+    scraper = ScraperPool(size=4, requests_per_second=2.0, cache=LookupCache(), chain_index=LicenseChainIndex(),
+                          search_strategy=SearchStrategy(DEFAULT_STATS_PATH), match_index=LicenseMatchIndex(),
+                          license_store=LicenseStore())
     pdf_filler = PDFFiller()
-    gui = ModernGUI(root, scraper, pdf_filler)
+    phases['components'] = time.perf_counter() - phase_start
+
+    phase_start = time.perf_counter()
+    gui = ModernGUI(root, scraper, pdf_filler, pdf_workers=2)
+    phases['window'] = time.perf_counter() - phase_start
+
+    if args.startup_time:
+        return report_startup(root, phases, args.startup_target)
     root.mainloop()
+    return 0
+
+def report_startup(root, phases, target):
+    # Draw the first frame, then report instead of entering the main loop
+    phase_start = time.perf_counter()
+    root.update()
+    phases['first_frame'] = time.perf_counter() - phase_start
+    total = time.perf_counter() - STARTED
+    root.destroy()
+
+    heavy_modules = ['selenium', 'PyPDF2', 'pdfrw', 'pandas', 'openpyxl', 'docx', 'playwright']
+    report = {
+        'seconds_to_window': round(total, 3),
+        'phases': {name: round(seconds, 3) for name, seconds in phases.items()},
+        'heavy_modules_loaded': [name for name in heavy_modules if name in sys.modules],
+        'target': target,
+    }
+    print(json.dumps(report, indent=2))
+    if target is not None and total > target:
+        logging.warning(f"Startup took {total:.2f}s, over the {target:.2f}s target")
+        return 1
+    return 0
 
 if __name__ == "__main__":
-    main()
+    multiprocessing.freeze_support()  # PDF workers are separate processes, also in the PyInstaller build
+    sys.exit(main())
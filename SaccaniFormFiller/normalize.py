@@ -0,0 +1,7 @@
+import re
+
+def normalize_text(value):
+    # Trim, case-fold and collapse inner whitespace: "CITRUS HEIGHTS " and "Citrus  Heights" compare equal
+    if value is None:
+        return ""
+    return re.sub(r'\s+', ' ', str(value)).strip().casefold()
@@ -1,12 +1,215 @@
-from pdfrw import PdfReader, PdfWriter, PdfName, PdfDict
 import os
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from PyPDF2 import PdfReader as PyPdfReader, PdfWriter as PyPdfWriter
+import zlib
 from io import BytesIO
+from template_cache import TemplateCache
+from instrumentation import timer
+
+# PyPDF2 is imported where it is used, so loading this module (and starting the GUI) stays cheap
+
+def load_template(path):
+    from PyPDF2 import PdfReader as PyPdfReader
+    # Read the bytes up front so no file handle stays open for the life of the cache
+    with open(path, 'rb') as f:
+        return PyPdfReader(BytesIO(f.read()))
+
+# field_mapping positions are inches from the top of an 11in page, the way the ReportLab overlay drew them
+POINTS_PER_INCH = 72
+PAGE_HEIGHT_INCHES = 11
+FONT_SIZE = 12
+CHECKBOX_SIZE = 12
+CHECKED_VALUES = ('true', 'yes', 'on', '1')
+# Resource names chosen so they can't clash with the template page's own
+OVERLAY_FONT = '/SaccaniF1'
+CHECKBOX_XOBJECT = '/SaccaniChk'
+
+def pdf_number(value):
+    return (b"%.2f" % value).rstrip(b"0").rstrip(b".") or b"0"
+
+def pdf_string(value):
+    # Literal string in Helvetica's WinAnsi encoding; line breaks would end the string, so they become spaces
+    data = str(value).encode('cp1252', 'replace')
+    for special in (b"\\", b"(", b")"):
+        data = data.replace(special, b"\\" + special)
+    return b"(" + data.replace(b"\r", b" ").replace(b"\n", b" ") + b")"
+
+class OverlayLayout:
+    """field_mapping compiled once into ready-made content stream fragments.
+
+    Positions are converted to points up front and checked boxes draw one shared form XObject,
+    so building an account's overlay is a handful of byte joins.
+    """
+
+    def __init__(self, field_mapping):
+        self.text_fields = []  # (field, Tm operator)
+        self.split_fields = []  # (field, [Tm operator]); Phone Number is drawn one dash-separated part per position
+        self.checkboxes = []  # (field, operators drawing the box)
+        for field, spec in field_mapping.items():
+            if isinstance(spec, list):
+                self.split_fields.append((field, [self.text_position(x, y) for x, y in spec]))
+                continue
+            x, y, field_type = spec
+            if field_type == 'TextBox':
+                self.text_fields.append((field, self.text_position(x, y)))
+            elif field_type == 'Checkbox':
+                px, py = self.point(x, y)
+                self.checkboxes.append((field, b"q 1 0 0 1 %s %s cm %s Do Q\n" % (pdf_number(px), pdf_number(py), CHECKBOX_XOBJECT.encode())))
+        self.text_start = b"BT %s %d Tf\n" % (OVERLAY_FONT.encode(), FONT_SIZE)
+
+    @staticmethod
+    def point(x, y):
+        return x * POINTS_PER_INCH, (PAGE_HEIGHT_INCHES - y) * POINTS_PER_INCH
+
+    def text_position(self, x, y):
+        px, py = self.point(x, y)
+        return b"1 0 0 1 %s %s Tm " % (pdf_number(px), pdf_number(py))
+
+    def content(self, account_data):
+        parts = [self.text_start]
+        for field, position in self.text_fields:
+            if field in account_data:
+                parts += (position, pdf_string(account_data[field]), b" Tj\n")
+        for field, positions in self.split_fields:
+            if account_data.get(field):
+                for position, part in zip(positions, str(account_data[field]).split('-')):
+                    parts += (position, pdf_string(part), b" Tj\n")
+        parts.append(b"ET\n")
+        for field, operators in self.checkboxes:
+            value = account_data.get(field)
+            if value is not None and str(value).lower() in CHECKED_VALUES:
+                parts.append(operators)
+        return b"".join(parts)
+
+def overlay_font():
+    from PyPDF2.generic import DictionaryObject, NameObject
+    return DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+        NameObject('/Encoding'): NameObject('/WinAnsiEncoding'),
+    })
+
+def checkbox_xobject():
+    from PyPDF2.generic import ArrayObject, DecodedStreamObject, FloatObject, NameObject
+    checkbox = DecodedStreamObject()
+    checkbox.set_data(b"0 0 %d %d re B" % (CHECKBOX_SIZE, CHECKBOX_SIZE))
+    checkbox.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Form'),
+        # The stroke reaches half a line width past the square
+        NameObject('/BBox'): ArrayObject([FloatObject(-1), FloatObject(-1), FloatObject(CHECKBOX_SIZE + 1), FloatObject(CHECKBOX_SIZE + 1)]),
+    })
+    return checkbox
+
+def with_overlay_resources(resources, font_ref, checkbox_ref):
+    # Copy of a resource dictionary with the overlay's font and checkbox added; the original is left alone
+    from PyPDF2.generic import DictionaryObject, NameObject
+    resources = resources.get_object() if resources is not None else DictionaryObject()
+    combined = DictionaryObject({NameObject(key): resources.raw_get(key) for key in resources})
+    for category, name, ref in (('/Font', OVERLAY_FONT, font_ref), ('/XObject', CHECKBOX_XOBJECT, checkbox_ref)):
+        entries = resources[category] if category in resources else DictionaryObject()
+        combined[NameObject(category)] = DictionaryObject({NameObject(key): entries.raw_get(key) for key in entries})
+        combined[category][NameObject(name)] = ref
+    return combined
+
+def content_refs(page):
+    # The page's content streams as a list, whether /Contents holds one stream or an array of them
+    from PyPDF2.generic import ArrayObject
+    contents = page.raw_get('/Contents') if '/Contents' in page else ArrayObject()
+    original = contents.get_object()
+    return list(original) if isinstance(original, ArrayObject) else [contents]
+
+def save_stream():
+    # Opens the q/Q pair the overlay stream closes, so graphics state the template leaves behind can't move or recolor the overlay
+    from PyPDF2.generic import DecodedStreamObject
+    save = DecodedStreamObject()
+    save.set_data(b"q\n")
+    return save
+
+def serialize(obj):
+    stream = BytesIO()
+    obj.write_to_stream(stream, None)
+    return stream.getvalue()
+
+def xref_table(offsets):
+    # offsets maps object number -> (byte offset, generation); runs of consecutive numbers share a subsection.
+    # Object 0, the head of the free list, is always listed; PyPDF2 renumbers every object of a table without it
+    sections = [(0, [b"0000000000 65535 f \n"])]
+    for idnum in sorted(offsets):
+        first, entries = sections[-1]
+        if first + len(entries) != idnum:
+            sections.append((idnum, []))
+        sections[-1][1].append(b"%010d %05d n \n" % offsets[idnum])
+    return b"xref\n" + b"".join(b"%d %d\n" % (first, len(entries)) + b"".join(entries) for first, entries in sections)
+
+def last_xref_offset(data):
+    return int(data[data.rindex(b"startxref") + len(b"startxref"):].split()[0])
+
+def resaved(reader):
+    # The first page alone, written out by PyPDF2, which always produces a plain cross-reference table
+    from PyPDF2 import PdfReader as PyPdfReader, PdfWriter as PyPdfWriter
+    writer = PyPdfWriter()
+    writer.add_page(reader.pages[0])
+    buffer = BytesIO()
+    writer.write(buffer)
+    return PyPdfReader(buffer)
+
+class CompiledTemplate:
+    """A template's first page, filled by appending a PDF incremental update to the untouched template bytes.
+
+    The replacement page object, the font and the checkbox are serialized once per template; a form is
+    those bytes plus its overlay stream, a short xref section and a trailer. Nothing is cloned or re-written.
+    """
+
+    def __init__(self, reader):
+        from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+        data = reader.stream.getvalue()
+        self.previous_xref = last_xref_offset(data)
+        if reader.is_encrypted or not data[self.previous_xref:].startswith(b"xref"):
+            # Cross-reference streams and encryption would need a matching update; compile_template re-saves the page instead
+            raise ValueError("Template needs a plain cross-reference table")
+
+        page = reader.pages[0]
+        page_ref = page.indirect_reference
+        size = reader.trailer['/Size']
+        font_id, checkbox_id, save_id, self.overlay_id = size, size + 1, size + 2, size + 3
+
+        new_page = DictionaryObject({NameObject(key): page.raw_get(key) for key in page})
+        new_page[NameObject('/Resources')] = with_overlay_resources(
+            page.raw_get('/Resources') if '/Resources' in page else None,
+            IndirectObject(font_id, 0, reader), IndirectObject(checkbox_id, 0, reader))
+        new_page[NameObject('/Contents')] = ArrayObject(
+            [IndirectObject(save_id, 0, reader)] + content_refs(page) + [IndirectObject(self.overlay_id, 0, reader)])
+
+        prefix = [data if data.endswith(b"\n") else data + b"\n"]
+        offsets = {}
+        for idnum, generation, obj in ((page_ref.idnum, page_ref.generation, new_page), (font_id, 0, overlay_font()),
+                                       (checkbox_id, 0, checkbox_xobject()), (save_id, 0, save_stream())):
+            offsets[idnum] = (sum(len(part) for part in prefix), generation)
+            prefix.append(b"%d %d obj\n" % (idnum, generation) + serialize(obj) + b"\nendobj\n")
+        self.prefix = b"".join(prefix)
+        offsets[self.overlay_id] = (len(self.prefix), 0)
+
+        trailer = DictionaryObject({NameObject(key): reader.trailer.raw_get(key) for key in ('/Root', '/Info', '/ID') if key in reader.trailer})
+        trailer.update({NameObject('/Size'): NumberObject(self.overlay_id + 1), NameObject('/Prev'): NumberObject(self.previous_xref)})
+        self.xref = xref_table(offsets) + b"trailer\n" + serialize(trailer) + b"\nstartxref\n"
+
+    def fill(self, overlay):
+        # The bytes of a filled form, in order; only the overlay and the final xref offset differ between forms
+        body = b"%d 0 obj\n<< /Length %d >>\nstream\n" % (self.overlay_id, len(overlay) + 3) + b"\nQ\n" + overlay + b"\nendstream\nendobj\n"
+        return [self.prefix, body, self.xref, b"%d\n%%%%EOF\n" % (len(self.prefix) + len(body))]
+
+def compile_template(reader):
+    try:
+        return CompiledTemplate(reader)
+    except (ValueError, KeyError):
+        # The copy has only the page, so forms from such a template lose its AcroForm
+        return CompiledTemplate(resaved(reader))
 
 class PDFFiller:
     def __init__(self):
+        self.templates = TemplateCache(load_template)
+        self.compiled_templates = TemplateCache(lambda path: compile_template(self.templates.get(path)))
+        self.layout = None
         self.field_mapping = {
             'New Account': (1.75, 1.75, 'Checkbox'),
             'Close Account': (1.75, 2.35, 'Checkbox'),
@@ -58,60 +261,139 @@ class PDFFiller:
     def fill_pdf(self, account_data, template_pdf_path, output_folder):
         output_folder = output_folder if output_folder.endswith('/') else output_folder + '/'
         os.makedirs(output_folder, exist_ok=True)
-        output_pdf_path = f'{output_folder}{account_data.get("BUSINESS_NAME", "Unknown").replace(" ", "_")}_{account_data.get("LICENSE_NUMBER", "Unknown")}.pdf'
+        # Names like "AM/PM" must not turn into subdirectories
+        output_pdf_path = f'{output_folder}{account_data.get("BUSINESS_NAME", "Unknown").replace(" ", "_").replace("/", "_")}_{account_data.get("LICENSE_NUMBER", "Unknown")}.pdf'
 
-        # Create a new PDF with ReportLab
-        packet = BytesIO()
-        can = canvas.Canvas(packet, pagesize=letter)
+        with timer('pdf.overlay'):
+            overlay = self.overlay_content(account_data)
 
-        for field, (x, y, field_type) in self.field_mapping.items():
-            if field in account_data:
-                value = account_data[field]
-                if field_type == 'TextBox':
-                    can.drawString(x * 72, (11 - y) * 72, str(value))  # Convert inches to points
-                elif field_type == 'Checkbox':
-                    if value.lower() in ('true', 'yes', 'on', '1'):
-                        can.rect(x * 72, (11 - y) * 72, 12, 12, fill=1)  # Draw filled rectangle for checked box
-            elif field == 'Phone Number' and 'Phone Number' in account_data:
-                phone_parts = account_data['Phone Number'].split('-')
-                for i, (x, y) in enumerate(value):
-                    if i < len(phone_parts):
-                        can.drawString(x * 72, (11 - y) * 72, phone_parts[i])
-
-        can.save()
-
-        # Move to the beginning of the StringIO buffer
-        packet.seek(0)
-        new_pdf = PyPdfReader(packet)
-
-        # Read your existing PDF
-        existing_pdf = PyPdfReader(open(template_pdf_path, "rb"))
-        output = PyPdfWriter()
-
-        # Add the "watermark" (which is the new pdf) on the existing page
-        page = existing_pdf.pages[0]
-        page.merge_page(new_pdf.pages[0])
-        output.add_page(page)
-
-        # Finally, write "output" to a real file
-        output_stream = open(output_pdf_path, "wb")
-        output.write(output_stream)
-        output_stream.close()
+        with timer('pdf.merge'):
+            parts = self.compiled_templates.get(template_pdf_path).fill(overlay)
+
+        # Finally, write the form to a real file
+        with timer('pdf.write'), open(output_pdf_path, "wb") as output_stream:
+            output_stream.writelines(parts)
 
         print(f"PDF saved for {account_data.get('BUSINESS_NAME', 'Unknown')} at {output_pdf_path}")
         return output_pdf_path
 
-    def extract_address_components(self, address):
-        parts = [part.strip() for part in address.split(',')]
-        street = parts[0] if len(parts) > 0 else ""
-        city = parts[1] if len(parts) > 1 else ""
-        state = ""
-        zip_code = ""
-        if len(parts) > 2:
-            state_zip = parts[2].strip()
-            state_zip_parts = state_zip.split()
-            if len(state_zip_parts) > 0:
-                state = state_zip_parts[0]
-            if len(state_zip_parts) > 1:
-                zip_code = state_zip_parts[1]
-        return street, city, state, zip_code
+    def overlay_content(self, account_data):
+        # Compiled on first use, so edits to field_mapping made right after construction still count
+        if self.layout is None:
+            self.layout = OverlayLayout(self.field_mapping)
+        return self.layout.content(account_data)
+
+class CombinedPdfWriter:
+    """Writes the filled forms of a batch as pages of one PDF, each page going to disk as it is added.
+
+    The file starts as a PyPDF2 copy of the template page. Every form appends its overlay stream and a page
+    object that reuses that page's content and resources, and close() appends the page tree, xref and trailer
+    as one incremental update, so only the object offsets are kept in memory.
+    """
+
+    def __init__(self, pdf_filler, template_pdf_path, output_pdf_path):
+        from PyPDF2.generic import DictionaryObject, IndirectObject, NameObject, NumberObject
+        self.pdf_filler = pdf_filler
+        self.output_pdf_path = output_pdf_path
+        self.page_count = 0
+
+        base = resaved(self.pdf_filler.templates.get(template_pdf_path))
+        data = base.stream.getvalue()
+        page = base.pages[0]
+        self.pages_ref = base.trailer['/Root'].raw_get('/Pages')
+        self.trailer = DictionaryObject({NameObject(key): base.trailer.raw_get(key) for key in ('/Root', '/Info', '/ID') if key in base.trailer})
+        self.trailer[NameObject('/Prev')] = NumberObject(last_xref_offset(data))
+        size = base.trailer['/Size']
+        font_id, checkbox_id, save_id, resources_id = size, size + 1, size + 2, size + 3
+        self.next_id = size + 4
+
+        # Widgets stay off the pages, since an annotation belongs to a single page
+        self.page_entries = {key: page.raw_get(key) for key in page if key not in ('/Parent', '/Resources', '/Contents', '/Annots')}
+        self.page_entries[NameObject('/Parent')] = self.pages_ref
+        self.page_entries[NameObject('/Resources')] = IndirectObject(resources_id, 0, base)
+        self.contents = [IndirectObject(save_id, 0, base)] + content_refs(page)
+        resources = with_overlay_resources(page.raw_get('/Resources') if '/Resources' in page else None,
+                                           IndirectObject(font_id, 0, base), IndirectObject(checkbox_id, 0, base))
+
+        self.offsets = {}
+        self.kids = []
+        self.position = 0
+        self.output = open(output_pdf_path, "wb")
+        self.write(data if data.endswith(b"\n") else data + b"\n")
+        for idnum, obj in ((font_id, overlay_font()), (checkbox_id, checkbox_xobject()), (save_id, save_stream()),
+                           (resources_id, resources)):
+            self.write_object(idnum, serialize(obj))
+
+    def write(self, data):
+        self.output.write(data)
+        self.position += len(data)
+
+    def write_object(self, idnum, body, generation=0):
+        self.offsets[idnum] = (self.position, generation)
+        self.write(b"%d %d obj\n" % (idnum, generation) + body + b"\nendobj\n")
+
+    def add(self, account_data):
+        with timer('pdf.overlay'):
+            overlay = self.pdf_filler.overlay_content(account_data)
+        with timer('pdf.write'):
+            return self.add_overlay(overlay)
+
+    def add_overlay(self, overlay):
+        from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject
+        overlay_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        data = zlib.compress(b"\nQ\n" + overlay)
+        self.write_object(overlay_id, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data) + data + b"\nendstream")
+        page = DictionaryObject(self.page_entries)
+        page[NameObject('/Contents')] = ArrayObject(self.contents + [IndirectObject(overlay_id, 0, None)])
+        self.write_object(page_id, serialize(page))
+        self.kids.append(page_id)
+        self.page_count += 1
+        return self.page_count
+
+    def close(self):
+        from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+        with timer('pdf.write'):
+            # Replaces the copy's page tree, so the unfilled template page is left out
+            pages = DictionaryObject({
+                NameObject('/Type'): NameObject('/Pages'),
+                NameObject('/Kids'): ArrayObject(IndirectObject(kid, 0, None) for kid in self.kids),
+                NameObject('/Count'): NumberObject(self.page_count),
+            })
+            self.write_object(self.pages_ref.idnum, serialize(pages), self.pages_ref.generation)
+            self.trailer[NameObject('/Size')] = NumberObject(self.next_id)
+            xref_offset = self.position
+            self.write(xref_table(self.offsets) + b"trailer\n" + serialize(self.trailer) + b"\nstartxref\n%d\n%%%%EOF\n" % xref_offset)
+            self.output.close()
+        print(f"Combined PDF with {self.page_count} pages saved at {self.output_pdf_path}")
+        return self.output_pdf_path
+
+class CombinedOutput:
+    """One CombinedPdfWriter per group, e.g. per route or salesperson, or a single one when group_by is None."""
+
+    def __init__(self, pdf_filler, template_pdf_path, output_folder, group_by=None, file_prefix="accounts"):
+        self.pdf_filler = pdf_filler
+        self.template_pdf_path = template_pdf_path
+        self.output_folder = output_folder
+        self.group_by = group_by
+        self.file_prefix = file_prefix
+        self.writers = {}
+        os.makedirs(output_folder, exist_ok=True)
+
+    def output_path(self, group):
+        name = self.file_prefix if group is None else f"{self.file_prefix}_{group}"
+        name = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+        return os.path.join(self.output_folder, f"{name}.pdf")
+
+    def add(self, account_data):
+        group = None
+        if self.group_by:
+            group = str(account_data.get(self.group_by) or "Unassigned").strip() or "Unassigned"
+        if group not in self.writers:
+            self.writers[group] = CombinedPdfWriter(self.pdf_filler, self.template_pdf_path, self.output_path(group))
+        writer = self.writers[group]
+        page_number = writer.add(account_data)
+        return f"{writer.output_pdf_path} (page {page_number})"
+
+    def close(self):
+        return [writer.close() for writer in self.writers.values()]
@@ -1,8 +1,14 @@
-from pdfrw import PdfReader, PdfWriter, PdfName, PdfDict
+from pdfrw import PdfReader, PdfWriter, PdfName, PdfDict, PdfString
+import logging
 import os
+from template_cache import TemplateCache
+from instrumentation import timer
 
 class PDFFiller:
     def __init__(self):
+        # Every fill clears and rewrites all field values, so one parsed template is reused for the whole batch.
+        # That makes a PDFFiller single-threaded; give each worker its own.
+        self.templates = TemplateCache(self.load_template)
         self.checkbox_fields = {
             "NEW ACCOUNT CHECKBOX": "New Account",
             "dhFormfield-4142143975": "Close Account",
@@ -53,84 +59,74 @@ class PDFFiller:
             'Salesperson': 'dhFormfield-4142143042',
         }
 
-    def clear_fields(self, template_pdf):
+    def load_template(self, template_pdf_path):
+        template_pdf = PdfReader(template_pdf_path)
+        return template_pdf, self.build_field_index(template_pdf)
+
+    def build_field_index(self, template_pdf):
+        # field name -> (widget annotations, kind, account_data key, phone part index), built once per template
+        phone_fields = self.field_mapping['Phone Number']
+        text_fields = {value: key for key, value in self.field_mapping.items() if not isinstance(value, list)}
+        index = {}
         for page in template_pdf.pages:
             annotations = page['/Annots']
             if annotations:
                 for annotation in annotations:
                     if annotation['/Subtype'] == '/Widget' and '/T' in annotation:
                         field_name = annotation['/T'][1:-1]  # Remove surrounding parentheses
-                        if field_name in self.checkbox_fields:
-                            # Clear checkbox
-                            annotation.update(PdfDict(AS=PdfName('Off'), V=''))
+                        if field_name in index:
+                            index[field_name][0].append(annotation)
+                        elif field_name in self.checkbox_fields:
+                            index[field_name] = ([annotation], 'checkbox', self.checkbox_fields[field_name], None)
+                        elif field_name in phone_fields:
+                            index[field_name] = ([annotation], 'phone', 'Phone Number', phone_fields.index(field_name))
+                        elif field_name in text_fields:
+                            index[field_name] = ([annotation], 'text', text_fields[field_name], None)
                         else:
-                            # Clear text field
-                            annotation.update(PdfDict(V=''))
-        return template_pdf
+                            index[field_name] = ([annotation], 'unmapped', None, None)
+        return index
+
+    def field_update(self, kind, key, part, account_data):
+        # Clearing and filling in one step: every field is written on every fill
+        if kind == 'checkbox':
+            checkbox_value = str(account_data.get(key, ''))
+            checkbox_state = checkbox_value.split(' ; ', 1)[0]
+            if checkbox_state.strip().lower() in ('yes', 'true', 'on', '1'):
+                return PdfDict(AS=PdfName('on'), V=PdfName('Yes'))
+            return PdfDict(AS=PdfName('Off'), V='')
+        value = ''
+        if kind == 'phone' and account_data.get(key):
+            phone_parts = account_data[key].split('-')
+            if len(phone_parts) == 3:
+                value = phone_parts[part]
+        elif kind == 'text' and key in account_data:
+            value = '{}'.format(account_data[key])
+        return PdfDict(V=PdfString.encode(value))
 
     def fill_pdf(self, account_data, template_pdf_path, output_folder):
         output_folder = output_folder if output_folder.endswith('/') else output_folder + '/'
         os.makedirs(output_folder, exist_ok=True)
-        output_pdf_path = f'{output_folder}{account_data.get("BUSINESS_NAME", "Unknown").replace(" ", "_")}_{account_data.get("LICENSE_NUMBER", "Unknown")}.pdf'
+        # Names like "AM/PM" must not turn into subdirectories
+        output_pdf_path = f'{output_folder}{account_data.get("BUSINESS_NAME", "Unknown").replace(" ", "_").replace("/", "_")}_{account_data.get("LICENSE_NUMBER", "Unknown")}.pdf'
 
-        template_pdf = PdfReader(template_pdf_path)
-        
-        # Clear all fields before filling
-        template_pdf = self.clear_fields(template_pdf)
+        template_pdf, field_index = self.templates.get(template_pdf_path)
 
-        print("DEBUG: Data to fill:")
-        for key, value in account_data.items():
-            print(f"{key}: {value}")
+        # Per-field debug output is only built when DEBUG logging is on; it used to dominate large batches
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        if debug:
+            logging.debug("Data to fill:")
+            for key, value in account_data.items():
+                logging.debug(f"{key}: {value}")
 
-        for page in template_pdf.pages:
-            annotations = page['/Annots']
-            if annotations:
-                for annotation in annotations:
-                    if annotation['/Subtype'] == '/Widget' and '/T' in annotation:
-                        field_name = annotation['/T'][1:-1]  # Remove surrounding parentheses
-                        print(f"DEBUG: Processing field: {field_name}")
-                        
-                        # Handle checkboxes
-                        if field_name in self.checkbox_fields:
-                            checkbox_value = account_data.get(field_name, '')
-                            checkbox_state, _ = checkbox_value.split(' ; ', 1) if ' ; ' in checkbox_value else (checkbox_value, '')
-                            if checkbox_state == 'Yes':
-                                print(f"DEBUG: Setting checkbox {field_name} to True")
-                                annotation.update(PdfDict(AS=PdfName('on'), V='/Yes'))
-                            else:
-                                print(f"DEBUG: Setting checkbox {field_name} to False")
-                                annotation.update(PdfDict(AS=PdfName('Off'), V=''))
-                        else:
-                            # Handle text fields
-                            for key, value in self.field_mapping.items():
-                                if isinstance(value, list) and field_name in value:
-                                    # Handle phone number fields
-                                    if key == 'Phone Number' and account_data.get(key):
-                                        phone_parts = account_data[key].split('-')
-                                        if len(phone_parts) == 3 and value.index(field_name) < len(phone_parts):
-                                            annotation.update(PdfDict(V='{}'.format(phone_parts[value.index(field_name)])))
-                                            print(f"DEBUG: Setting phone field {field_name} to {phone_parts[value.index(field_name)]}")
-                                elif field_name == value:
-                                    if key in account_data:
-                                        print(f"DEBUG: Setting text field {field_name} to {account_data[key]}")
-                                        annotation.update(PdfDict(V='{}'.format(account_data[key])))
-                                    break
+        with timer('pdf.fill_fields'):
+            for field_name, (widgets, kind, key, part) in field_index.items():
+                update = self.field_update(kind, key, part, account_data)
+                for annotation in widgets:
+                    annotation.update(update)
+                if debug:
+                    logging.debug(f"Setting {kind} field {field_name} to {update}")
 
-        PdfWriter().write(output_pdf_path, template_pdf)
-        print(f"PDF saved for {account_data.get('BUSINESS_NAME', 'Unknown')} at {output_pdf_path}")
+        with timer('pdf.write'):
+            PdfWriter().write(output_pdf_path, template_pdf)
+        logging.info(f"PDF saved for {account_data.get('BUSINESS_NAME', 'Unknown')} at {output_pdf_path}")
         return output_pdf_path
-
-    def extract_address_components(self, address):
-        parts = [part.strip() for part in address.split(',')]
-        street = parts[0] if len(parts) > 0 else ""
-        city = parts[1] if len(parts) > 1 else ""
-        state = ""
-        zip_code = ""
-        if len(parts) > 2:
-            state_zip = parts[2].strip()
-            state_zip_parts = state_zip.split()
-            if len(state_zip_parts) > 0:
-                state = state_zip_parts[0]
-            if len(state_zip_parts) > 1:
-                zip_code = state_zip_parts[1]
-        return street, city, state, zip_code
@@ -0,0 +1,216 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pdf_filler import CombinedOutput
+from address import AddressNormalizer
+from normalize import normalize_text
+from account_dedupe import DuplicateIndex
+from run_journal import RunJournal, input_fingerprint
+from instrumentation import METRICS, RUN_REPORT_NAME, timer
+
+# Each PDF worker process builds one filler and keeps it, along with its cached template, for the whole batch
+_worker_filler = None
+
+def _init_pdf_worker(filler_factory):
+    global _worker_filler
+    _worker_filler = filler_factory()
+
+def _render_pdf(account_data, template_pdf_path, output_folder):
+    # The worker's timings travel back with the result and are merged into the parent's METRICS
+    pdf_path = _worker_filler.fill_pdf(account_data, template_pdf_path, output_folder)
+    return pdf_path, METRICS.drain()
+
+def build_account_record(account_data, account_number, additional_info, addresses):
+    record = dict(account_data)
+    record['ACCOUNT_NUMBER'] = account_number
+    record.update(additional_info)
+
+    with timer('address.parse'):
+        parts = addresses.normalize(record.get('BUSINESS_ADDRESS', ''))
+    county = parts.pop('COUNTY')
+    record.update(parts)
+    # The county on the license page wins; the ZIP table only fills it in when the page had none
+    if county and normalize_text(record.get('COUNTY')) in ('', 'not found'):
+        record['COUNTY'] = county
+    return record
+
+class BatchPipeline:
+    """Scraping feeds a bounded queue of account records; a process pool renders the PDFs."""
+
+    _DONE = object()
+
+    def __init__(self, scraper, pdf_filler, pdf_workers=2, queue_size=32, output_mode='per_account', group_by=None,
+                 journal=True, resume=False, addresses=None):
+        if output_mode == 'combined' and not hasattr(pdf_filler, 'overlay_content'):
+            # Combined pages are built from overlays; the acroform filler (pdf_filler2) fills form fields instead
+            raise ValueError("Combined output needs the overlay filler (pdf_filler)")
+        self.scraper = scraper
+        self.pdf_filler = pdf_filler  # Used in this process when pdf_workers is 0
+        self.addresses = addresses or AddressNormalizer()  # Splits BUSINESS_ADDRESS into the form's address fields
+        self.pdf_workers = pdf_workers
+        self.queue_size = queue_size
+        # 'per_account' writes one PDF per account; 'combined' appends every form to one PDF per group_by value
+        self.output_mode = output_mode
+        self.group_by = group_by
+        self.combined_paths = []
+        self.duplicates = DuplicateIndex()  # Duplicate Client/City rows share one lookup
+        self.journal_enabled = journal  # Keep a RunJournal in the output folder
+        # Skip rows whose PDF already exists for unchanged input; combined files are rebuilt, so only per-account output can resume
+        self.resume = resume and output_mode == 'per_account'
+        self.journal = None
+        self.fingerprints = {}
+        self.skipped = 0
+        self.report = None  # Timings and counters of the last run, also written to RUN_REPORT_NAME
+
+    def run(self, businesses, template_pdf_path, output_folder, additional_info, on_event=None):
+        # on_event(kind, index, business, detail) with kind in 'scraped', 'no_data', 'pdf_written', 'failed', 'skipped'
+        on_event = self._counted(on_event or (lambda kind, index, business, detail: None))
+        if self.journal_enabled:
+            self.journal = RunJournal(output_folder)
+            on_event = self._journaled(on_event)
+        rows = self._pending_rows(businesses, additional_info, on_event)
+        combined = None
+        if self.output_mode == 'combined':
+            # Pages go into shared writers in this process; overlays are cheap compared with the writes they save
+            combined = CombinedOutput(self.pdf_filler, template_pdf_path, output_folder, group_by=self.group_by)
+
+        if self.pdf_workers and combined is None:
+            # Spawned, not forked: scraper threads are already running and a forked worker would inherit their held locks
+            executor = ProcessPoolExecutor(max_workers=self.pdf_workers, mp_context=multiprocessing.get_context('spawn'),
+                                           initializer=_init_pdf_worker, initargs=(type(self.pdf_filler),))
+        else:
+            executor = None
+
+        records = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        scrape_thread = threading.Thread(target=self._scrape_stage, args=(rows, additional_info, records, on_event, stop),
+                                         name="scrape-stage", daemon=True)
+        scrape_thread.start()
+        in_flight = {}
+        try:
+            while True:
+                item = records.get()
+                if item is self._DONE:
+                    break
+                index, business, record = item
+                if combined is not None:
+                    self._add_combined(index, business, record, combined, on_event)
+                    continue
+                if executor is None:
+                    self._render_inline(index, business, record, template_pdf_path, output_folder, on_event)
+                    continue
+                future = executor.submit(_render_pdf, record, template_pdf_path, output_folder)
+                in_flight[future] = (index, business)
+                # Bound the PDFs waiting on workers the same way the queue bounds the scraped records
+                if len(in_flight) >= self.queue_size:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self._report(done, in_flight, on_event)
+                else:
+                    self._report([future for future in in_flight if future.done()], in_flight, on_event)
+            if in_flight:
+                done, _ = wait(in_flight)
+                self._report(done, in_flight, on_event)
+            if combined is not None:
+                self.combined_paths = combined.close()
+            self.report = METRICS.write_report(os.path.join(output_folder, RUN_REPORT_NAME))
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+            # If this loop stopped early the scrape stage may be blocked on the full queue; take its records until it exits
+            stop.set()
+            while scrape_thread.is_alive():
+                try:
+                    records.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            scrape_thread.join()
+            if self.journal:
+                self.journal.close()
+
+    def _pending_rows(self, businesses, additional_info, on_event):
+        # (input row index, business) for every row that still needs work
+        for index, business in enumerate(businesses):
+            fingerprint = input_fingerprint(business, additional_info)
+            self.fingerprints[index] = fingerprint
+            if self.resume and self.journal and self.journal.is_finished(fingerprint):
+                self.skipped += 1
+                on_event('skipped', index, business, self.journal.latest[fingerprint]['pdf_path'])
+                continue
+            yield index, business
+
+    def _counted(self, on_event):
+        def count_and_forward(kind, index, business, detail):
+            METRICS.count(f"rows.{kind}")
+            on_event(kind, index, business, detail)
+        return count_and_forward
+
+    def _journaled(self, on_event):
+        def record_and_forward(kind, index, business, detail):
+            fingerprint = self.fingerprints.get(index)
+            if fingerprint and kind != 'skipped':
+                if kind == 'pdf_written':
+                    self.journal.record(fingerprint, index, business, kind, pdf_path=detail if self.output_mode == 'per_account' else None,
+                                        output=detail)
+                elif kind == 'scraped':
+                    self.journal.record(fingerprint, index, business, kind, license_number=detail.get('LICENSE_NUMBER'))
+                else:
+                    self.journal.record(fingerprint, index, business, kind, reason=detail or "No data found")
+            on_event(kind, index, business, detail)
+        return record_and_forward
+
+    def _scrape_stage(self, rows, additional_info, records, on_event, stop):
+        try:
+            rows, query_rows = itertools.tee(rows)
+            results = self.scraper.scrape_all(self.duplicates.unique_queries(business for _, business in query_rows))
+            for index, business in rows:
+                if stop.is_set():
+                    break
+                try:
+                    account_data = self.duplicates.resolve(business, results)
+                except Exception as e:
+                    on_event('failed', index, business, f"Scrape failed: {str(e)}")
+                    continue
+                if not account_data:
+                    on_event('no_data', index, business, None)
+                    continue
+                on_event('scraped', index, business, account_data)
+                try:
+                    record = build_account_record(account_data, business.get('Account #', ''), additional_info, self.addresses)
+                    if self.group_by and business.get(self.group_by):
+                        # Routes and salespeople differ per row of the input file; additional_info is only the batch-wide fallback
+                        record[self.group_by] = business[self.group_by]
+                except Exception as e:
+                    on_event('failed', index, business, f"Could not build account record: {str(e)}")
+                    continue
+                records.put((index, business, record))
+        except Exception as e:
+            logging.error(f"Scrape stage stopped: {str(e)}")
+        finally:
+            records.put(self._DONE)
+
+    def _render_inline(self, index, business, record, template_pdf_path, output_folder, on_event):
+        try:
+            pdf_path = self.pdf_filler.fill_pdf(record, template_pdf_path, output_folder)
+            on_event('pdf_written', index, business, pdf_path)
+        except Exception as e:
+            on_event('failed', index, business, f"PDF generation failed: {str(e)}")
+
+    def _add_combined(self, index, business, record, combined, on_event):
+        try:
+            on_event('pdf_written', index, business, combined.add(record))
+        except Exception as e:
+            on_event('failed', index, business, f"PDF generation failed: {str(e)}")
+
+    def _report(self, futures, in_flight, on_event):
+        for future in futures:
+            index, business = in_flight.pop(future)
+            try:
+                pdf_path, worker_metrics = future.result()
+                METRICS.merge(worker_metrics)
+                on_event('pdf_written', index, business, pdf_path)
+            except Exception as e:
+                on_event('failed', index, business, f"PDF generation failed: {str(e)}")
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+JOURNAL_NAME = "run_journal.jsonl"
+
+def input_fingerprint(business, additional_info):
+    # Everything that ends up on the form apart from the scraped data
+    payload = json.dumps({'row': business, 'additional_info': additional_info}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+class RunJournal:
+    """Append-only JSONL log of each input row's progress, kept in the output folder.
+
+    A resumed run skips rows whose PDF was written from the same input and still exists,
+    and retries everything else.
+    """
+
+    def __init__(self, output_folder, file_name=JOURNAL_NAME):
+        self.path = os.path.join(output_folder, file_name)
+        self.lock = threading.Lock()
+        self.latest = {}  # fingerprint -> last entry recorded for it
+        os.makedirs(output_folder, exist_ok=True)
+        self.load()
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash can leave a half-written last line
+                    logging.warning(f"Ignoring unreadable line {line_number} in {self.path}")
+                    continue
+                self.latest[entry['fingerprint']] = entry
+
+    def record(self, fingerprint, index, business, state, **detail):
+        entry = {
+            'fingerprint': fingerprint,
+            'row': index,
+            'account': business.get('Account #', ''),
+            'client': business.get('Client', ''),
+            'state': state,
+            'time': time.time(),
+        }
+        entry.update(detail)
+        with self.lock:
+            self.latest[fingerprint] = entry
+            self.file.write(json.dumps(entry, default=str) + "\n")
+            self.file.flush()  # Every line is on disk before the next row starts
+
+    def is_finished(self, fingerprint):
+        entry = self.latest.get(fingerprint)
+        return bool(entry and entry['state'] == 'pdf_written' and entry.get('pdf_path') and os.path.exists(entry['pdf_path']))
+
+    def summary(self):
+        counts = {}
+        for entry in self.latest.values():
+            counts[entry['state']] = counts.get(entry['state'], 0) + 1
+        return counts
+
+    def close(self):
+        with self.lock:
+            self.file.close()
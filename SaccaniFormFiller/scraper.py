@@ -1,129 +1,351 @@
-import re
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import logging
+import os
+import threading
+import time
+from urllib.parse import urljoin
+import requests
+import license_parser
+from search_strategy import SearchStrategy
+from instrumentation import METRICS, timer, count
+from http_scraper import HttpLicenseClient, BrowserRequired, ABC_BASE_URL, SEARCH_PATH, SINGLE_LICENSE_PATH
+
+DEFAULT_CHROMEDRIVER_PATH = os.environ.get('CHROMEDRIVER_PATH', '/Users/tylerbessire/drivers/chromedriver/chromedriver')
+DETAILS_HEADING_XPATH = '//*[@id="et-boc"]/div/div[1]/div/div/div[2]/div/div[2]/div[1]/div[1]/h2'
+NO_RESULTS_XPATH = "//*[contains(text(), 'No results') or contains(text(), 'No Results') or contains(text(), 'No records found') or contains(text(), 'No matching records')]"
+
+# Selenium takes a noticeable part of startup and the HTTP path never needs it, so import_selenium()
+# fills these in when the first browser is launched. Every method using them runs after that.
+webdriver = Service = Options = By = WebDriverWait = EC = None
+TimeoutException = NoSuchElementException = WebDriverException = None
+
+def import_selenium():
+    global webdriver, Service, Options, By, WebDriverWait, EC, TimeoutException, NoSuchElementException, WebDriverException
+    if webdriver is not None:
+        return
+    from selenium import webdriver as selenium_webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+    webdriver = selenium_webdriver
 
 class BusinessScraper:
-    def __init__(self):
+    def __init__(self, chromedriver_path=DEFAULT_CHROMEDRIVER_PATH, rate_limiter=None, use_http=True, base_url=ABC_BASE_URL,
+                 cache=None, chain_index=None, max_chain_depth=10, extraction_mode='page_source', license_fields=None,
+                 search_strategy=None, search_timeout=10, no_results_xpath=NO_RESULTS_XPATH,
+                 report_ambiguity=False, match_index=None, chrome_arguments=(), license_store=None):
         self.driver = None
+        self.chromedriver_path = chromedriver_path
+        self.chrome_arguments = list(chrome_arguments)  # e.g. --no-sandbox inside containers
+        self.rate_limiter = rate_limiter  # Shared RateLimiter when several scrapers hit the site at once
+        self.base_url = base_url
+        # Plain HTTP lookups first; Chrome is only started when a page needs it
+        self.http_client = HttpLicenseClient(base_url, throttle=self.throttle, cache=cache, chain_index=chain_index,
+                                          max_chain_depth=max_chain_depth, license_fields=license_fields,
+                                          on_ambiguous=self.record_ambiguity if report_ambiguity else None) if use_http else None
+        self.cache = cache  # Optional LookupCache shared by every scraper in a pool
+        self.chain_index = chain_index  # Optional LicenseChainIndex of known transfers
+        self.match_index = match_index  # Optional LicenseMatchIndex of names already resolved to a license
+        self.license_store = license_store  # Optional LicenseStore imported from a bulk export, asked before the site
+        self.max_chain_depth = max_chain_depth
+        self.extraction_mode = extraction_mode  # 'page_source' parses the page once, 'xpath' waits on each field
+        self.license_fields = license_fields or license_parser.LICENSE_FIELDS
+        self.search_strategy = search_strategy or SearchStrategy()
+        self.search_timeout = search_timeout  # One wait covering details page, results table and empty result
+        self.no_results_xpath = no_results_xpath
+        self.outcome_latencies = {}  # outcome -> seconds from submit until it appeared
+        self.stats_lock = threading.Lock()
+        self.report_ambiguity = report_ambiguity  # Also fetch every candidate of a city search, in parallel
+        self.ambiguity_reports = []
+        self.lookup_failed = False  # Set when a lookup errored, so the miss isn't cached as "no results"
 
     def setup_driver(self):
+        if self.http_client:
+            return  # Started lazily by ensure_driver on the first Selenium fallback
+        self.launch_driver()
+
+    def ensure_driver(self):
+        if self.driver is None:
+            self.launch_driver()
+
+    def launch_driver(self):
+        import_selenium()
         chrome_options = Options()
         chrome_options.add_argument("--headless")
+        for argument in self.chrome_arguments:
+            chrome_options.add_argument(argument)
         
         # Use the path to the manually downloaded ChromeDriver
-        self.driver = webdriver.Chrome(service=Service('/Users/tylerbessire/drivers/chromedriver/chromedriver'), options=chrome_options)
+        with timer('driver.startup'):
+            self.driver = webdriver.Chrome(service=Service(self.chromedriver_path), options=chrome_options)
+
+    def restart_driver(self):
+        self.quit_driver()
+        self.setup_driver()
+
+    def is_alive(self):
+        if self.driver is None:
+            return self.http_client is not None  # Nothing to crash until the first fallback
+        try:
+            self.driver.current_url  # Any round trip fails once the browser or session is gone
+            return True
+        except WebDriverException:
+            return False
+
+    def throttle(self):
+        if self.rate_limiter:
+            self.rate_limiter.wait()
 
     def scrape_business(self, business_name, city):
-        search_variations = self.generate_search_variations(business_name)
-        
-        for variation in search_variations:
+        with timer('scrape.lookup'):
+            return self.lookup_business(business_name, city)
+
+    def lookup_business(self, business_name, city):
+        if self.license_store:
+            stored = self.license_store.find_business(business_name, city)
+            if stored:
+                count('license_store.hits')
+                logging.info(f"License store hit for '{business_name}' in {city}")
+                return stored
+
+        if self.cache:
+            found, cached = self.cache.get_business(business_name, city)
+            if found:
+                logging.info(f"Cache hit for '{business_name}' in {city}")
+                return cached
+
+        self.lookup_failed = False
+        result = None
+        if self.match_index:
+            # A name we have resolved before (even spelled a bit differently) goes straight to its license page
+            license_number = self.match_index.best_match(business_name, city)
+            if license_number:
+                count('match_index.hits')
+                logging.info(f"Local match for '{business_name}' in {city}: license {license_number}")
+                result = self.scrape_license(license_number)
+        if not result:
+            result = self.scrape_variations(business_name, city)
+        if self.cache and (result or not self.lookup_failed):
+            self.cache.put_business(business_name, city, result)
+            if result:
+                self.cache.put_license(result.get('LICENSE_NUMBER'), result)
+        if self.match_index and result:
+            self.match_index.add_result(business_name, city, result)
+        return result
+
+    def scrape_license(self, license_number):
+        if self.license_store:
+            stored = self.license_store.get_license(license_number)
+            if stored:
+                count('license_store.hits')
+                return stored
+        if self.http_client:
+            try:
+                return self.http_client.fetch_license(license_number)
+            except BrowserRequired as e:
+                logging.info(f"Falling back to Selenium for license {license_number}: {str(e)}")
+            except requests.RequestException as e:
+                logging.error(f"HTTP error fetching license {license_number}: {str(e)}")
+                self.lookup_failed = True
+                return None
+        try:
+            self.ensure_driver()
+            return self.open_license(license_number, [])
+        except Exception as e:
+            logging.error(f"Error fetching license {license_number}: {str(e)}")
+            self.lookup_failed = True
+            return None
+
+    def scrape_variations(self, business_name, city):
+        # The first hit ends the search; a results table was already narrowed to the city's rows
+        for variant_type, variation in self.search_strategy.variations(business_name, city):
+            count('search.variants_tried')
             result = self.search_and_scrape(variation, city)
+            if not self.lookup_failed:  # Errors say nothing about how good a variant is
+                self.search_strategy.record(business_name, city, variant_type, variation, bool(result))
             if result:
                 return result
-        
+
         logging.warning(f"No results found for all variations of '{business_name}' in {city}")
         return None
 
     def generate_search_variations(self, business_name):
-        variations = [
-            business_name,
-            re.sub(r'[^\w\s]', '', business_name),  # Remove punctuation
-            business_name.lower(),
-            ' '.join(business_name.split()[:2]),  # First two words
-            ' '.join(business_name.split()[:2]).lower(),  # First two words, lowercase
-        ]
-        return list(dict.fromkeys(variations))  # Remove duplicates while preserving order
+        return [variation for _, variation in self.search_strategy.variations(business_name)]
 
     def search_and_scrape(self, business_name, city):
+        if self.http_client:
+            try:
+                return self.http_client.search_and_scrape(business_name, city)
+            except BrowserRequired as e:
+                logging.info(f"Falling back to Selenium for '{business_name}': {str(e)}")
+            except requests.RequestException as e:
+                logging.error(f"HTTP error searching for business '{business_name}': {str(e)}")
+                self.lookup_failed = True
+                return None
+        return self.search_and_scrape_selenium(business_name, city)
+
+    def search_and_scrape_selenium(self, business_name, city):
         try:
-            self.driver.get("https://www.abc.ca.gov/licensing/license-lookup/business-name/")
-            search_input = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, "BusinessName"))
-            )
-            search_input.clear()
-            search_input.send_keys(business_name)
-            search_input.submit()
+            self.ensure_driver()
+            self.throttle()
+            with timer('search.submit'):
+                self.driver.get(self.base_url + SEARCH_PATH)
+                search_input = WebDriverWait(self.driver, 10).until(
+                    EC.presence_of_element_located((By.ID, "BusinessName"))
+                )
+                search_input.clear()
+                search_input.send_keys(business_name)
+                search_input.submit()
 
-            if self.is_on_details_page():
+            outcome = self.wait_for_search_outcome()
+            if outcome == 'details':
                 return self.extract_license_details()
-            elif self.has_search_results():
+            elif outcome == 'results':
                 return self.perform_city_search(city)
-            else:
+            elif outcome == 'empty':
                 logging.info(f"No results found for '{business_name}'")
                 return None
+            else:
+                logging.info(f"No search outcome for '{business_name}' after {self.search_timeout}s")
+                return None
         except Exception as e:
             logging.error(f"Error searching for business '{business_name}': {str(e)}")
+            self.lookup_failed = True
             return None
 
-    def is_on_details_page(self):
-        try:
-            WebDriverWait(self.driver, 5).until(
-                EC.presence_of_element_located((By.XPATH, '//*[@id="et-boc"]/div/div[1]/div/div/div[2]/div/div[2]/div[1]/div[1]/h2'))
-            )
-            return True
-        except TimeoutException:
+    def wait_for_search_outcome(self):
+        # Watch for all three possible pages at once instead of timing out on one before checking the next
+        start = time.monotonic()
+
+        def detect_outcome(driver):
+            if self.is_on_details_page():
+                return 'details'
+            if self.has_search_results():
+                return 'results'
+            if self.has_no_results():
+                return 'empty'
             return False
 
-    def has_search_results(self):
         try:
-            WebDriverWait(self.driver, 5).until(
-                EC.presence_of_element_located((By.ID, "abc_licenses"))
-            )
-            return True
+            outcome = WebDriverWait(self.driver, self.search_timeout, poll_frequency=0.1).until(detect_outcome)
         except TimeoutException:
-            return False
+            outcome = 'timeout'
+            count('search.timeouts')
+        latency = time.monotonic() - start
+        METRICS.record(f'search.wait.{outcome}', latency)
+        with self.stats_lock:
+            self.outcome_latencies.setdefault(outcome, []).append(latency)
+        return outcome
+
+    def is_on_details_page(self):
+        with timer('search.check.details'):
+            return bool(self.driver.find_elements(By.XPATH, DETAILS_HEADING_XPATH))
+
+    def has_search_results(self):
+        with timer('search.check.results'):
+            return bool(self.driver.find_elements(By.ID, "abc_licenses"))
+
+    def has_no_results(self):
+        with timer('search.check.empty'):
+            return bool(self.driver.find_elements(By.XPATH, self.no_results_xpath))
+
+    def outcome_latency_summary(self):
+        with self.stats_lock:
+            return {outcome: {'count': len(times), 'mean': sum(times) / len(times), 'max': max(times)}
+                    for outcome, times in self.outcome_latencies.items() if times}
 
     def extract_license_details(self):
         return self.follow_license_chain()
 
-    def follow_license_chain(self):
+    def follow_license_chain(self, visited=None):
+        visited = visited if visited is not None else []
         try:
             status_element = WebDriverWait(self.driver, 5).until(
                 EC.presence_of_element_located((By.XPATH, "//dt[contains(text(), 'License Type Status:')]/following-sibling::dd[1]"))
             )
             status = status_element.text.strip().upper()
+            license_elements = self.driver.find_elements(By.XPATH, "//dt[contains(text(), 'License Number:')]/following-sibling::dd[1]")
+            license_number = license_elements[0].text.strip() if license_elements else ""
+            if license_number:
+                visited.append(license_number)
 
             if status == "ACTIVE":
                 logging.info("Found active license. Extracting details.")
                 return self.extract_active_license_details()
             elif status == "CANCELED":
+                if len(visited) > self.max_chain_depth:
+                    logging.warning(f"License chain exceeds {self.max_chain_depth} hops: {' -> '.join(visited)}")
+                    return None
+
+                # Jump straight to the end of a chain we have already walked
+                shortcut = self.chain_index.shortcut(license_number, visited) if self.chain_index and license_number else None
+                if shortcut:
+                    logging.info(f"Known transfer chain {license_number} -> {shortcut}, skipping intermediate licenses.")
+                    return self.open_license(shortcut, visited)
+
                 logging.info("License is canceled. Attempting to find new license number.")
                 transfer_element = self.driver.find_element(By.XPATH, "//dt[contains(text(), 'Transfers:')]/following-sibling::dd[1]")
                 new_license_link = transfer_element.find_element(By.XPATH, ".//a[contains(@href, '/licensing/license-lookup/single-license/?RPTTYPE=12&LICENSE=')]")
-                new_license_number = new_license_link.text
+                new_license_number = new_license_link.text.strip()
                 logging.info(f"Found new license number: {new_license_number}")
-                new_license_link.click()
-                
-                # Wait for the new page to load
-                WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, '//*[@id="et-boc"]/div/div[1]/div/div/div[2]/div/div[2]/div[1]/div[1]/h2'))
-                )
+                if self.chain_index and license_number:
+                    self.chain_index.record_transfer(license_number, new_license_number)
+                if new_license_number in visited:
+                    logging.warning(f"License transfer cycle detected: {' -> '.join(visited + [new_license_number])}")
+                    return None
+                if self.cache:
+                    found, cached = self.cache.get_license(new_license_number)
+                    if found and cached:
+                        logging.info(f"Cache hit for license {new_license_number}")
+                        return cached
+                self.throttle()
+                count('license.transfers')
+                with timer('license.chain_hop'):
+                    new_license_link.click()
+
+                    # Wait for the new page to load
+                    WebDriverWait(self.driver, 10).until(
+                        EC.presence_of_element_located((By.XPATH, DETAILS_HEADING_XPATH))
+                    )
                 
                 # Recursively follow the chain
-                return self.follow_license_chain()
+                return self.follow_license_chain(visited)
             else:
                 logging.warning(f"Unexpected license status: {status}")
                 return None
 
         except (TimeoutException, NoSuchElementException) as e:
             logging.error(f"Error while following license chain: {str(e)}")
+            self.lookup_failed = True
             return None
 
+    def open_license(self, license_number, visited):
+        if self.cache:
+            found, cached = self.cache.get_license(license_number)
+            if found and cached:
+                logging.info(f"Cache hit for license {license_number}")
+                return cached
+        self.throttle()
+        with timer('license.open'):
+            self.driver.get(self.base_url + SINGLE_LICENSE_PATH.format(license_number))
+            WebDriverWait(self.driver, 10).until(
+                EC.presence_of_element_located((By.XPATH, DETAILS_HEADING_XPATH))
+            )
+        return self.follow_license_chain(visited)
+
     def extract_active_license_details(self):
-        mappings = {
-            'LICENSE_NUMBER': "//dt[contains(text(), 'License Number:')]/following-sibling::dd[1]",
-            'PRIMARY_OWNER': "//dt[contains(text(), 'Primary Owner:')]/following-sibling::dd[1]",
-            'BUSINESS_NAME': "//h2[contains(text(), 'Business Name')]/following-sibling::p[1]",
-            'BUSINESS_ADDRESS': "//h2[contains(text(), 'Business Address')]/following-sibling::p[1]",
-            'COUNTY': "//dt[contains(text(), 'County:')]/following-sibling::dd[1]",
-            'LICENSE_TYPE_STATUS': "//dt[contains(text(), 'License Type Status:')]/following-sibling::dd[1]"
-        }
+        with timer('license.extract_fields'):
+            return self.extract_fields()
+
+    def extract_fields(self):
+        if self.extraction_mode == 'page_source':
+            # One page_source round trip, then every field is read locally
+            tree = license_parser.parse_page(self.driver.page_source)
+            return license_parser.parse_license_details(tree, self.license_fields)
+
+        mappings = {key: license_parser.field_xpath(tag, label) for key, (tag, label) in self.license_fields.items()}
 
         account_data = {}
         for key, xpath in mappings.items():
@@ -150,22 +372,55 @@ class BusinessScraper:
                 EC.visibility_of_element_located((By.CSS_SELECTOR, "table#abc_licenses"))
             )
 
-            active_or_pending_rows = self.driver.find_elements(By.XPATH, "//tr[td[contains(text(), '(ACTIVE)') or contains(text(), '(PEND)')]]")
-            results = []
-            for row in active_or_pending_rows:
-                license_link = row.find_element(By.XPATH, ".//a")
-                license_link.click()
-                result = self.extract_license_details()
-                results.append(result)
-                self.driver.back()
-                WebDriverWait(self.driver, 10).until(
-                    EC.visibility_of_element_located((By.CSS_SELECTOR, "table#abc_licenses"))
-                )
-            return results[0] if results else None  # Return the first result if any
+            # Pick the best row straight from the table and open only that one
+            page_url = self.driver.current_url
+            rows = license_parser.parse_results_table(license_parser.parse_page(self.driver.page_source))
+            candidates = license_parser.rank_candidates(rows, city)
+            if not candidates:
+                return None
+            if self.report_ambiguity and len(candidates) > 1:
+                self.record_ambiguity(city, candidates, page_url)
+
+            self.throttle()
+            self.driver.get(urljoin(page_url, candidates[0]['href']))
+            WebDriverWait(self.driver, 10).until(
+                EC.presence_of_element_located((By.XPATH, DETAILS_HEADING_XPATH))
+            )
+            return self.extract_license_details()
         except Exception as e:
             logging.error(f"Error during city search: {str(e)}")
+            self.lookup_failed = True
             return None
 
+    def record_ambiguity(self, city, candidates, page_url):
+        http_client = self.http_client or HttpLicenseClient(self.base_url, throttle=self.throttle, license_fields=self.license_fields)
+        details = http_client.fetch_candidates(candidates, page_url)
+        report = {
+            'city': city,
+            'chosen': candidates[0]['license_number'],
+            'candidates': [dict(row, details=row_details) for row, row_details in zip(candidates, details)],
+        }
+        with self.stats_lock:
+            self.ambiguity_reports.append(report)
+        logging.info(f"{len(candidates)} candidate licenses in {city}, chose {report['chosen']}")
+
+    def scrape_all(self, queries):
+        # Sequential counterpart of ScraperPool.scrape_all so callers can use either, failed lookups included
+        for business_name, city in queries:
+            try:
+                yield self.scrape_business(business_name, city)
+            except Exception as e:
+                logging.error(f"Lookup failed for '{business_name}': {str(e)}")
+                yield e
+
     def close_driver(self):
+        self.search_strategy.save()
+        self.quit_driver()
+
+    def quit_driver(self):
         if self.driver:
-            self.driver.quit()
+            try:
+                self.driver.quit()
+            except WebDriverException as e:
+                logging.warning(f"Error while quitting driver: {str(e)}")
+            self.driver = None
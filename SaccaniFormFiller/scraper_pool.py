@@ -0,0 +1,124 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from scraper import BusinessScraper
+from instrumentation import timer
+
+class RateLimiter:
+    """Spaces out requests across all threads so the ABC site sees at most `requests_per_second`."""
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.lock = threading.Lock()
+        self.next_allowed = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_allowed - now
+            self.next_allowed = max(now, self.next_allowed) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+class ScraperPool:
+    """A fixed set of BusinessScrapers, each owning a warm Chrome instance, fed from one work queue."""
+
+    def __init__(self, size=4, requests_per_second=2.0, scraper_factory=BusinessScraper, max_restarts=3, **scraper_kwargs):
+        self.size = size
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.scraper_factory = scraper_factory
+        self.scraper_kwargs = scraper_kwargs
+        self.cache = scraper_kwargs.get('cache')
+        self.search_strategy = scraper_kwargs.get('search_strategy')
+        self.license_store = scraper_kwargs.get('license_store')
+        self.max_restarts = max_restarts
+        self.scrapers = []
+        self.idle = queue.Queue()
+        self.executor = None
+
+    def setup_driver(self):
+        if self.executor:
+            return
+        for _ in range(self.size):
+            scraper = self.scraper_factory(rate_limiter=self.rate_limiter, **self.scraper_kwargs)
+            scraper.setup_driver()
+            self.scrapers.append(scraper)
+            self.idle.put(scraper)
+        self.executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="scraper")
+
+    def scrape_business(self, business_name, city):
+        with timer('pool.wait_for_scraper'):
+            scraper = self.idle.get()
+        try:
+            return self._scrape_with_restart(scraper, business_name, city)
+        finally:
+            self.idle.put(scraper)
+
+    def _scrape_with_restart(self, scraper, business_name, city):
+        for attempt in range(self.max_restarts + 1):
+            try:
+                result = scraper.scrape_business(business_name, city)
+            except Exception as e:
+                logging.error(f"Scraper crashed on '{business_name}': {str(e)}")
+                result = None
+            # search_and_scrape swallows errors, so a dead browser only shows up as a failed health check
+            if scraper.is_alive():
+                return result
+            logging.warning(f"Chrome driver died while scraping '{business_name}', restarting (attempt {attempt + 1})")
+            try:
+                scraper.restart_driver()
+            except Exception as e:
+                logging.error(f"Failed to restart Chrome driver: {str(e)}")
+        return None
+
+    def scrape_all(self, queries):
+        # Hands queries to whichever driver is free and yields results in input order.
+        # Only a couple of queries per driver are in flight, so `queries` can be a lazy iterator.
+        if not self.executor:
+            self.setup_driver()
+        # A failed lookup yields its exception in place of a result, so the queries after it still run
+        pending = deque()
+        for business_name, city in queries:
+            pending.append((business_name, self.executor.submit(self.scrape_business, business_name, city)))
+            if len(pending) >= self.size * 2:
+                yield self._outcome(*pending.popleft())
+        while pending:
+            yield self._outcome(*pending.popleft())
+
+    @staticmethod
+    def _outcome(business_name, future):
+        try:
+            return future.result()
+        except Exception as e:
+            logging.error(f"Lookup failed for '{business_name}': {str(e)}")
+            return e
+
+    def outcome_latency_summary(self):
+        merged = {}
+        for scraper in self.scrapers:
+            with scraper.stats_lock:
+                for outcome, times in scraper.outcome_latencies.items():
+                    merged.setdefault(outcome, []).extend(times)
+        return {outcome: {'count': len(times), 'mean': sum(times) / len(times), 'max': max(times)}
+                for outcome, times in merged.items() if times}
+
+    @property
+    def ambiguity_reports(self):
+        return [report for scraper in self.scrapers for report in scraper.ambiguity_reports]
+
+    def close_driver(self):
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        for scraper in self.scrapers:
+            scraper.quit_driver()
+        # The scrapers share the pool's search strategy, so its stats are written once here
+        if self.search_strategy:
+            self.search_strategy.save()
+        self.scrapers = []
+        self.idle = queue.Queue()
@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import re
+import threading
+from normalize import normalize_text
+
+DEFAULT_STATS_PATH = os.path.join(os.path.expanduser('~'), '.saccani', 'search_stats.json')
+
+# Variant types in their default order, used until there are stats to reorder them
+SEARCH_VARIANTS = {
+    'original': lambda name: name,
+    'no_punctuation': lambda name: re.sub(r'[^\w\s]', '', name),  # Remove punctuation
+    'lowercase': lambda name: name.lower(),
+    'first_two_words': lambda name: ' '.join(name.split()[:2]),
+    'first_two_words_lowercase': lambda name: ' '.join(name.split()[:2]).lower(),
+}
+
+def name_pattern(business_name):
+    # Coarse shape of a client name; variant hit rates are learned per shape
+    if re.search(r'#\s*\d+', business_name):
+        return 'store_number'
+    if re.search(r'[^\w\s]', business_name):
+        return 'punctuation'
+    words = business_name.split()
+    if len(words) <= 1:
+        return 'single_word'
+    if len(words) == 2:
+        return 'two_words'
+    return 'multi_word'
+
+class SearchStrategy:
+    """Orders search variants by how often each one found a business with a similar name."""
+
+    def __init__(self, stats_path=None):
+        self.stats_path = stats_path
+        self.lock = threading.Lock()
+        self.stats = {}  # pattern -> variant type -> [attempts, hits]
+        self.failed_queries = set()  # (query, city) pairs that came back empty during this run
+        if stats_path and os.path.exists(stats_path):
+            try:
+                with open(stats_path, 'r') as f:
+                    self.stats = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not load search stats from {stats_path}: {str(e)}")
+
+    def hit_rate(self, pattern, variant_type):
+        attempts, hits = self.stats.get(pattern, {}).get(variant_type, [0, 0])
+        return (hits + 1) / (attempts + 2)  # Untried variants start at 50%
+
+    def variations(self, business_name, city=None):
+        # (variant type, query) pairs, best first, without queries the site would treat the same
+        # and without queries that already failed for this city
+        pattern = name_pattern(business_name)
+        with self.lock:
+            ranked = sorted(enumerate(SEARCH_VARIANTS.items()),
+                            key=lambda item: (-self.hit_rate(pattern, item[1][0]), item[0]))
+        variations = []
+        seen = set()
+        for _, (variant_type, make_query) in ranked:
+            query = make_query(business_name).strip()
+            key = normalize_text(query)  # The ABC search ignores case and spacing
+            if query and key not in seen and (key, normalize_text(city)) not in self.failed_queries:
+                seen.add(key)
+                variations.append((variant_type, query))
+        return variations
+
+    def record(self, business_name, city, variant_type, query, found):
+        pattern = name_pattern(business_name)
+        with self.lock:
+            if not found:
+                self.failed_queries.add((normalize_text(query), normalize_text(city)))
+            counts = self.stats.setdefault(pattern, {}).setdefault(variant_type, [0, 0])
+            counts[0] += 1
+            counts[1] += 1 if found else 0
+
+    def hit_rate_report(self):
+        lines = []
+        with self.lock:
+            for pattern, variants in sorted(self.stats.items()):
+                for variant_type, (attempts, hits) in sorted(variants.items(), key=lambda item: -item[1][1]):
+                    rate = hits / attempts * 100 if attempts else 0.0
+                    lines.append(f"{pattern:<14} {variant_type:<26} {hits:>5}/{attempts:<5} ({rate:.1f}%)")
+        return lines
+
+    def log_hit_rates(self):
+        for line in self.hit_rate_report():
+            logging.info(f"Search variant hit rate: {line}")
+
+    def save(self):
+        if not self.stats_path:
+            return
+        if os.path.dirname(self.stats_path):
+            os.makedirs(os.path.dirname(self.stats_path), exist_ok=True)
+        with self.lock:
+            data = json.dumps(self.stats, indent=2)
+        with open(self.stats_path, 'w') as f:
+            f.write(data)
@@ -0,0 +1,30 @@
+import os
+import threading
+from collections import OrderedDict
+
+class TemplateCache:
+    """Parsed PDF templates keyed by path and modification time, so a batch parses BASE.pdf once."""
+
+    def __init__(self, loader, max_entries=4):
+        self.loader = loader
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        key = (path, os.path.getmtime(path))  # An edited template gets re-parsed
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        template = self.loader(path)
+        with self.lock:
+            self.entries[key] = template
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return template
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,64 @@
+import pytest
+
+from address import AddressNormalizer
+from pipeline import build_account_record
+
+@pytest.fixture(scope='module')
+def addresses():
+    return AddressNormalizer()
+
+def fields(street, city, state, zip_code, county):
+    return {'STREET': street, 'CITY': city, 'STATE': state, 'ZIP_CODE': zip_code, 'COUNTY': county}
+
+@pytest.mark.parametrize('address, expected', [
+    # The site renders the street and "CITY, CA ZIP" on separate lines
+    ("205 DOUGLAS BLVD\nROSEVILLE, CA 95678", fields('205 DOUGLAS BLVD', 'ROSEVILLE', 'CA', '95678', 'PLACER')),
+    ("205 DOUGLAS BLVD, ROSEVILLE, CA 95678-1234", fields('205 DOUGLAS BLVD', 'ROSEVILLE', 'CA', '95678', 'PLACER')),
+    ("12 J ST,, SACRAMENTO ,CA. 95814", fields('12 J ST', 'SACRAMENTO', 'CA', '95814', 'SACRAMENTO')),
+    # Unit segments stay with the street
+    ("100 MAIN ST, STE 4, ROSEVILLE, CA 95678", fields('100 MAIN ST, STE 4', 'ROSEVILLE', 'CA', '95678', 'PLACER')),
+    ("100 MAIN ST\n#B\nROSEVILLE, CA 95678", fields('100 MAIN ST, #B', 'ROSEVILLE', 'CA', '95678', 'PLACER')),
+    # No comma before the city: only a city the table knows is split off
+    ("100 MAIN ST ROSEVILLE CA 95678", fields('100 MAIN ST', 'ROSEVILLE', 'CA', '95678', 'PLACER')),
+    ("100 MAIN ST WEST SACRAMENTO CA", fields('100 MAIN ST', 'WEST SACRAMENTO', 'CA', '', 'YOLO')),
+    # A missing ZIP is not guessed, but a city with one county fills in the county
+    ("100 MAIN ST, ROSEVILLE, CA", fields('100 MAIN ST', 'ROSEVILLE', 'CA', '', 'PLACER')),
+    # A missing city comes from the ZIP; a different town name for the ZIP is kept
+    ("100 MAIN ST, CA 95678", fields('100 MAIN ST', 'ROSEVILLE', 'CA', '95678', 'PLACER')),
+    ("100 MAIN ST, GRANITE BAY, CA 95678", fields('100 MAIN ST', 'GRANITE BAY', 'CA', '95678', 'PLACER')),
+    # Street suffixes that are also state codes
+    ("1 OAK CT", fields('1 OAK CT', '', '', '', '')),
+    ("1 OAK CT 95678", fields('1 OAK CT', 'ROSEVILLE', 'CA', '95678', 'PLACER')),
+    ("1 OAK CT, 95678", fields('1 OAK CT', 'ROSEVILLE', 'CA', '95678', 'PLACER')),
+    ("1 OAK CT ROSEVILLE 95678", fields('1 OAK CT', 'ROSEVILLE', 'CA', '95678', 'PLACER')),
+    ("1 OAK CT, ROSEVILLE, CA 95678", fields('1 OAK CT', 'ROSEVILLE', 'CA', '95678', 'PLACER')),
+    # Outside the table the address's own state stands
+    ("9 ELM ST, RENO, NV 89501", fields('9 ELM ST', 'RENO', 'NV', '89501', '')),
+    ("Not found", fields('', '', '', '', '')),
+    ("", fields('', '', '', '', '')),
+])
+def test_parse(addresses, address, expected):
+    assert addresses.normalize(address) == expected
+
+def test_without_zip_table(tmp_path):
+    addresses = AddressNormalizer(str(tmp_path / 'missing.csv'))
+    assert addresses.normalize("205 DOUGLAS BLVD\nROSEVILLE, CA 95678") == fields('205 DOUGLAS BLVD', 'ROSEVILLE', 'CA', '95678', '')
+
+def test_normalize_many_parses_each_distinct_address_once(monkeypatch):
+    addresses = AddressNormalizer()
+    parsed = []
+    parse = addresses.parse
+    monkeypatch.setattr(addresses, 'parse', lambda address: parsed.append(address) or parse(address))
+    column = ["1 OAK CT 95678", "12 J ST, SACRAMENTO, CA 95814", "1 OAK CT 95678"]
+    results = addresses.normalize_many(column)
+    assert [result['CITY'] for result in results] == ['ROSEVILLE', 'SACRAMENTO', 'ROSEVILLE']
+    results[0]['CITY'] = 'EDITED'  # callers get copies
+    assert addresses.normalize("1 OAK CT 95678")['CITY'] == 'ROSEVILLE'
+    assert sorted(parsed) == sorted(set(column))
+
+def test_license_page_county_wins(addresses):
+    account = {'BUSINESS_ADDRESS': "1 OAK CT 95678", 'COUNTY': 'SACRAMENTO'}
+    record = build_account_record(account, 'A-1', {}, addresses)
+    assert (record['STREET'], record['STATE'], record['COUNTY']) == ('1 OAK CT', 'CA', 'SACRAMENTO')
+    record = build_account_record(dict(account, COUNTY='Not found'), 'A-1', {}, addresses)
+    assert record['COUNTY'] == 'PLACER'
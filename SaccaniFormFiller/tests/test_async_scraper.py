@@ -0,0 +1,206 @@
+import asyncio
+import os
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from async_scraper import AsyncBusinessScraper
+from http_scraper import SEARCH_PATH
+from license_chain import LicenseChainIndex
+from lookup_cache import LookupCache
+from search_strategy import SearchStrategy
+
+PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+# Business name typed into the search box -> saved page the site answers with
+SEARCH_RESULTS = {
+    'GOLDEN BEAR': 'results_golden_bear.html',
+    'OAK TAVERN': 'license_540210.html',
+}
+
+def saved_page(name):
+    with open(os.path.join(PAGES, name), encoding='utf-8') as f:
+        return f.read()
+
+class SavedPage:
+    """A browser tab over the saved ABC pages: searches and license links load the page the site would render."""
+
+    def __init__(self, context):
+        self.context = context
+        self.url = ''
+        self.html = ''
+        self.query = ''
+
+    async def goto(self, url):
+        await asyncio.sleep(0.01)
+        self.url = url
+        parsed = urlparse(url)
+        if parsed.path == SEARCH_PATH:
+            self.html = saved_page('search.html')
+        else:
+            self.html = saved_page(f"license_{parse_qs(parsed.query)['LICENSE'][0]}.html")
+
+    async def fill(self, selector, value):
+        if selector == '#BusinessName':
+            self.query = value
+
+    async def press(self, selector, key):
+        self.html = saved_page(SEARCH_RESULTS.get(self.query, 'no_results.html'))
+
+    async def content(self):
+        return self.html
+
+    async def wait_for_selector(self, selector, state=None):
+        pass
+
+    def is_closed(self):
+        return False
+
+class SavedContext:
+    def __init__(self):
+        self.pages = []
+
+    def set_default_timeout(self, timeout):
+        pass
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def new_page(self):
+        page = SavedPage(self)
+        self.pages.append(page)
+        return page
+
+class SavedBrowser:
+    def __init__(self):
+        self.context = None
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    async def new_context(self, user_agent=None):
+        self.context = SavedContext()
+        return self.context
+
+    async def close(self):
+        self.closed = True
+
+class SavedPlaywright:
+    def __init__(self):
+        self.chromium = self
+        self.browser = None
+        self.stopped = False
+
+    async def launch(self, headless=True, args=()):
+        self.browser = SavedBrowser()
+        return self.browser
+
+    async def stop(self):
+        self.stopped = True
+
+class CountingStrategy(SearchStrategy):
+    def __init__(self):
+        super().__init__()
+        self.saves = 0
+
+    def save(self):
+        self.saves += 1
+
+class SavedPagesScraper(AsyncBusinessScraper):
+    def __init__(self, **kwargs):
+        kwargs.setdefault('requests_per_second', 0)
+        kwargs.setdefault('search_timeout', 2)
+        super().__init__(**kwargs)
+        self.fake_playwright = SavedPlaywright()
+
+    async def _start_playwright(self):
+        return self.fake_playwright
+
+class LoopWatchingCache(LookupCache):
+    """Notes every call made on the scraper's event loop thread."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.loop_thread = None
+        self.calls_on_loop = []
+
+    def get(self, key):
+        if threading.current_thread() is self.loop_thread:
+            self.calls_on_loop.append(('get', key))
+        return super().get(key)
+
+    def put(self, key, data):
+        if threading.current_thread() is self.loop_thread:
+            self.calls_on_loop.append(('put', key))
+        return super().put(key, data)
+
+@pytest.fixture
+def scraper():
+    scraper = SavedPagesScraper(concurrency=2, search_strategy=CountingStrategy())
+    yield scraper
+    scraper.close_driver()
+
+def test_results_table_picks_the_city_row(scraper):
+    details = scraper.scrape_business('GOLDEN BEAR', 'ROSEVILLE')
+    assert details['LICENSE_NUMBER'] == '612003'
+
+def test_no_results_for_any_variation(scraper):
+    assert scraper.scrape_business('NOWHERE CAFE', 'ROSEVILLE') is None
+
+def test_canceled_license_follows_the_transfer(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache, chains = LoopWatchingCache(path), LicenseChainIndex(path)
+    scraper = SavedPagesScraper(cache=cache, chain_index=chains)
+    try:
+        scraper.setup_driver()
+        cache.loop_thread = scraper.loop_thread
+        details = scraper.scrape_business('OAK TAVERN', 'AUBURN')
+        assert details['LICENSE_NUMBER'] == '601555'
+        assert chains.resolve('540210') == '601555'
+        assert cache.get_business('OAK TAVERN', 'AUBURN') == (True, details)
+        # The SQLite stores were used, but never from the event loop thread
+        assert cache.stats['writes'] and not cache.calls_on_loop
+    finally:
+        scraper.close_driver()
+        cache.close()
+        chains.close()
+
+def test_lookups_never_exceed_concurrency():
+    class SlowScraper(SavedPagesScraper):
+        active = peak = 0
+
+        async def lookup_business(self, business_name, city):
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            await asyncio.sleep(0.02)
+            self.active -= 1
+            return {'BUSINESS_NAME': business_name}
+
+    scraper = SlowScraper(concurrency=2)
+    try:
+        names = [f"STORE {number}" for number in range(8)]
+        results = list(scraper.scrape_all((name, 'ROSEVILLE') for name in names))
+        assert [result['BUSINESS_NAME'] for result in results] == names
+        assert scraper.peak == 2
+    finally:
+        scraper.close_driver()
+
+def test_tabs_are_reused_up_to_concurrency(scraper):
+    results = list(scraper.scrape_all([('GOLDEN BEAR', 'ROSEVILLE')] * 6))
+    assert [result['LICENSE_NUMBER'] for result in results] == ['612003'] * 6
+    assert len(scraper.fake_playwright.browser.context.pages) <= 2
+
+def test_close_driver_stops_the_browser_and_loop(scraper):
+    scraper.scrape_business('GOLDEN BEAR', 'ROSEVILLE')
+    loop_thread = scraper.loop_thread
+    scraper.close_driver()
+    assert scraper.fake_playwright.browser.closed and scraper.fake_playwright.stopped
+    assert scraper.loop is None and not loop_thread.is_alive()
+    assert scraper.search_strategy.saves == 1
+
+def test_close_driver_before_start_only_saves_stats():
+    strategy = CountingStrategy()
+    SavedPagesScraper(search_strategy=strategy).close_driver()
+    assert strategy.saves == 1
@@ -0,0 +1,19 @@
+import pytest
+
+from cli import parse_args
+
+BASE = ['--input', 'accounts.csv', '--output', 'out']
+
+def test_group_by_needs_combined_output(capsys):
+    with pytest.raises(SystemExit):
+        parse_args(BASE + ['--group-by', 'Route #'])
+    assert "--group-by needs --output-mode combined" in capsys.readouterr().err
+
+def test_acroform_filler_cannot_write_combined_output(capsys):
+    with pytest.raises(SystemExit):
+        parse_args(BASE + ['--output-mode', 'combined', '--filler', 'acroform'])
+    assert "--filler acroform" in capsys.readouterr().err
+
+def test_combined_output_grouped_by_route():
+    args = parse_args(BASE + ['--output-mode', 'combined', '--group-by', 'Route #'])
+    assert (args.output_mode, args.group_by, args.filler) == ('combined', 'Route #', 'overlay')
@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+from form_fields import load_profile
+
+def test_yaml_profile(tmp_path):
+    path = tmp_path / 'route7.yaml'
+    path.write_text("additional_info:\n  'Route #': 7\n  Salesperson: Dana\n  New Account: yes\n  Monday: true\n  Friday: off\n", encoding='utf-8')
+    values = load_profile(str(path))
+    assert (values['Route #'], values['Salesperson']) == ('7', 'Dana')
+    assert (values['New Account'], values['Monday'], values['Friday'], values['Tuesday']) == ('on', 'on', 'Off', 'Off')
+
+def test_json_profile(tmp_path):
+    path = tmp_path / 'route7.json'
+    path.write_text(json.dumps({'Buyer': 'Sam', 'Credit Application No': 'on'}), encoding='utf-8')
+    values = load_profile(str(path))
+    assert (values['Buyer'], values['Credit Application No'], values['Route #']) == ('Sam', 'on', '')
+
+def test_unknown_field_is_rejected(tmp_path):
+    path = tmp_path / 'typo.json'
+    path.write_text(json.dumps({'Rout #': '7'}), encoding='utf-8')
+    with pytest.raises(ValueError, match="Rout #"):
+        load_profile(str(path))
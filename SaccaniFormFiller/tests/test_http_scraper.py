@@ -0,0 +1,106 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from http_scraper import BrowserRequired, HttpLicenseClient, SEARCH_PATH
+
+PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+# Business name searched -> saved page answering it
+SEARCH_RESULTS = {
+    'GOLDEN BEAR': 'results_golden_bear.html',
+    'OAK TAVERN': 'license_540210.html',
+    'NOWHERE CAFE': 'no_results.html',
+    'SCRIPTED': 'results_script_rendered.html',
+}
+
+class SavedAbcSite:
+    """Serves the saved ABC pages in tests/pages the way the license lookup answers."""
+
+    def __init__(self):
+        self.requests = []
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.requests.append(self.path)
+                name = site.page_for(urlparse(self.path))
+                if name is None:
+                    self.send_error(404)
+                    return
+                with open(os.path.join(PAGES, name), 'rb') as f:
+                    data = f.read()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        host, port = self.server.server_address[:2]
+        self.base_url = f"http://{host}:{port}"
+
+    def page_for(self, url):
+        params = parse_qs(url.query)
+        if url.path == SEARCH_PATH and 'BusinessName' in params:
+            assert params.get('RPTTYPE') == ['3']  # hidden form fields are carried over
+            return SEARCH_RESULTS.get(params['BusinessName'][0])
+        if url.path == SEARCH_PATH:
+            return 'search.html'
+        if 'LICENSE' in params:
+            name = f"license_{params['LICENSE'][0]}.html"
+            return name if os.path.exists(os.path.join(PAGES, name)) else None
+        return None
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture(scope='module')
+def site():
+    site = SavedAbcSite()
+    yield site
+    site.stop()
+
+@pytest.fixture
+def client(site):
+    return HttpLicenseClient(base_url=site.base_url, timeout=5)
+
+def test_results_table_picks_the_city_row(site, client):
+    details = client.search_and_scrape('GOLDEN BEAR', 'ROSEVILLE')
+    assert details['LICENSE_NUMBER'] == '612003'
+    assert details['BUSINESS_ADDRESS'] == '205 DOUGLAS BLVD\nROSEVILLE, CA 95678'
+    assert site.requests[-1].endswith('LICENSE=612003')
+
+def test_ambiguous_city_is_reported(site):
+    reports = []
+    client = HttpLicenseClient(base_url=site.base_url, timeout=5, on_ambiguous=lambda city, rows, url: reports.append((city, rows)))
+    client.search_and_scrape('GOLDEN BEAR', 'ROSEVILLE')
+    assert [(city, [row['license_number'] for row in rows]) for city, rows in reports] == [('ROSEVILLE', ['612003', '612002', '612001'])]
+
+def test_city_without_rows_is_no_match(client):
+    assert client.search_and_scrape('GOLDEN BEAR', 'DAVIS') is None
+
+def test_canceled_license_follows_transfer(site, client):
+    details = client.search_and_scrape('OAK TAVERN', 'AUBURN')
+    assert details['LICENSE_NUMBER'] == '601555'
+    assert details['BUSINESS_NAME'] == 'OAK TAVERN & GRILL'
+    assert site.requests[-1].endswith('LICENSE=601555')
+
+def test_no_results(client):
+    assert client.search_and_scrape('NOWHERE CAFE', 'AUBURN') is None
+
+def test_script_rendered_results_need_the_browser(client):
+    with pytest.raises(BrowserRequired):
+        client.search_and_scrape('SCRIPTED', 'AUBURN')
+
+def test_fetch_license_by_number(client):
+    assert client.fetch_license('612003')['COUNTY'] == 'PLACER'
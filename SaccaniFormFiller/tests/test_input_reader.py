@@ -0,0 +1,82 @@
+import types
+
+import pytest
+
+from input_reader import count_records, iter_records, open_input_file, read_input_file
+
+HEADER = ['Account #', 'Client ', ' City']
+ROWS = [['1', 'GOLDEN BEAR ', 'ROSEVILLE'], ['2', 'OAK TAVERN', ' AUBURN '], ['3', 'RIVER CAFE', 'SACRAMENTO']]
+EXPECTED = [
+    {'Account #': '1', 'Client': 'GOLDEN BEAR', 'City': 'ROSEVILLE'},
+    {'Account #': '2', 'Client': 'OAK TAVERN', 'City': 'AUBURN'},
+    {'Account #': '3', 'Client': 'RIVER CAFE', 'City': 'SACRAMENTO'},
+]
+
+def write_csv(path, lines, newline="\n"):
+    path.write_bytes(("\ufeff" + newline.join(lines)).encode('utf-8'))
+    return str(path)
+
+@pytest.fixture
+def csv_file(tmp_path):
+    # Export padding in headers and cells, a BOM, a blank row and no trailing newline
+    lines = [','.join(HEADER)] + [','.join(row) for row in ROWS[:2]] + [',,'] + [','.join(ROWS[2])]
+    return write_csv(tmp_path / 'accounts.csv', lines)
+
+def test_csv_records_are_stripped_and_blank_rows_dropped(csv_file):
+    assert list(iter_records(csv_file)) == EXPECTED
+
+def test_records_stream_one_at_a_time(csv_file):
+    total, records = open_input_file(csv_file)
+    assert isinstance(records, types.GeneratorType)
+    assert next(records) == EXPECTED[0]
+    assert total == 4  # An estimate: the blank row is still counted
+    assert read_input_file(csv_file, limit=2) == EXPECTED[:2]
+
+def test_csv_count_with_and_without_trailing_newline(tmp_path):
+    lines = [','.join(HEADER)] + [','.join(row) for row in ROWS]
+    assert count_records(write_csv(tmp_path / 'a.csv', lines)) == 3
+    assert count_records(write_csv(tmp_path / 'b.csv', lines + [''])) == 3
+    assert count_records(write_csv(tmp_path / 'c.txt', lines + [''], newline="\r\n")) == 3
+    assert count_records(write_csv(tmp_path / 'header_only.csv', [','.join(HEADER)])) == 0
+    assert count_records(write_csv(tmp_path / 'empty.csv', [])) == 0
+    assert list(iter_records(str(tmp_path / 'empty.csv'))) == []
+
+def test_unsupported_extension(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported file type: .pdf"):
+        iter_records(str(tmp_path / 'accounts.pdf'))
+    assert count_records(str(tmp_path / 'accounts.pdf')) is None
+
+def test_xlsx_rows_stream_with_headers_from_the_first_row(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    path = str(tmp_path / 'accounts.xlsx')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER + [None])  # An unnamed column past the data
+    sheet.append(ROWS[0] + [None])
+    sheet.append([None, None, None, None])
+    sheet.append([2, 'OAK TAVERN', ' AUBURN '])  # Numbers stay numbers
+    sheet.append(ROWS[2])
+    workbook.save(path)
+
+    records = list(iter_records(path))
+    assert [record['Client'] for record in records] == ['GOLDEN BEAR', 'OAK TAVERN', 'RIVER CAFE']
+    assert records[1]['Account #'] == 2 and records[1]['City'] == 'AUBURN'
+    assert count_records(path) == 4
+
+def test_empty_xlsx_has_no_records(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    path = str(tmp_path / 'empty.xlsx')
+    openpyxl.Workbook().save(path)
+    assert list(iter_records(path)) == []
+
+def test_docx_lines_are_comma_separated_records(tmp_path):
+    docx = pytest.importorskip('docx')
+    path = str(tmp_path / 'accounts.docx')
+    document = docx.Document()
+    for line in [','.join(HEADER), ''] + [','.join(row) for row in ROWS]:
+        document.add_paragraph(line)
+    document.save(path)
+
+    total, records = open_input_file(path)
+    assert total is None  # No cheap count for Word files
+    assert list(records) == EXPECTED
@@ -0,0 +1,38 @@
+import os
+import threading
+import pytest
+from instrumentation import METRICS
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork")
+def test_forked_child_does_not_wait_on_a_lock_held_by_a_parent_thread():
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold_lock():
+        with METRICS.lock:
+            held.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    held.wait()
+    try:
+        pid = os.fork()
+        if pid == 0:
+            # Child: the copied lock is still held by a thread that doesn't exist here
+            METRICS.count('child.count')
+            os._exit(0 if METRICS.counters == {'child.count': 1} else 1)
+        finished, status = 0, 0
+        for _ in range(100):
+            finished, status = os.waitpid(pid, os.WNOHANG)
+            if finished:
+                break
+            release.wait(0.05)
+        if not finished:
+            os.kill(pid, 9)
+            os.waitpid(pid, 0)
+            pytest.fail("Forked child hung on the inherited METRICS lock")
+        assert os.waitstatus_to_exitcode(status) == 0
+    finally:
+        release.set()
+        holder.join()
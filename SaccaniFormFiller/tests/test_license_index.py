@@ -0,0 +1,38 @@
+import pytest
+
+from license_index import LicenseMatchIndex
+
+@pytest.fixture
+def index(tmp_path):
+    index = LicenseMatchIndex(str(tmp_path / 'cache.db'))
+    yield index
+    index.close()
+
+@pytest.mark.parametrize('known, query', [
+    ('CVS PHARMACY #9876', 'CVS PHARMACY #9877'),
+    ('GROCERY OUTLET OF ROSEVILLE #2', 'GROCERY OUTLET OF ROSEVILLE #3'),
+    ('WALGREENS DRUG STORE 05431', 'WALGREENS DRUG STORE 05432'),
+])
+def test_other_store_number_of_same_chain_is_not_a_match(index, known, query):
+    index.add(known, 'ROSEVILLE', '111111')
+    assert index.matches(query, 'ROSEVILLE')[0][0] >= index.threshold  # the names alone would pass
+    assert index.best_match(query, 'ROSEVILLE') is None
+
+@pytest.mark.parametrize('known, query', [
+    ('CVS PHARMACY #9876', 'CVS/PHARMACY 9876'),
+    ('GROCERY OUTLET OF ROSEVILLE #2', 'Grocery Outlet of Roseville #2'),
+    ('SAFEWAY STORE', 'SAFEWAY INC'),
+])
+def test_same_store_spelled_differently_matches(index, known, query):
+    index.add(known, 'ROSEVILLE', '111111')
+    assert index.best_match(query, 'ROSEVILLE') == '111111'
+
+def test_matching_store_number_is_chosen_among_siblings(index):
+    index.add('CVS PHARMACY #9876', 'ROSEVILLE', '111111')
+    index.add('CVS PHARMACY #9877', 'ROSEVILLE', '222222')
+    assert index.best_match('CVS PHARMACY # 9877', 'ROSEVILLE') == '222222'
+    assert index.best_match('CVS PHARMACY', 'ROSEVILLE') is None
+
+def test_matches_stay_within_city(index):
+    index.add('CVS PHARMACY #9876', 'ROSEVILLE', '111111')
+    assert index.best_match('CVS PHARMACY #9876', 'SACRAMENTO') is None
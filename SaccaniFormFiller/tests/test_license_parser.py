@@ -0,0 +1,59 @@
+import os
+
+from lxml import html
+
+import license_parser
+
+PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+def saved_page(name):
+    with open(os.path.join(PAGES, name), 'rb') as f:
+        return license_parser.parse_page(f.read())
+
+def test_active_details_page():
+    tree = saved_page('license_612003.html')
+    assert license_parser.is_details_page(tree)
+    assert license_parser.parse_license_status(tree) == 'ACTIVE'
+    details = license_parser.parse_license_details(tree)
+    assert details['LICENSE_NUMBER'] == '612003'
+    assert details['BUSINESS_NAME'] == 'GOLDEN BEAR MARKET #3'
+    assert details['BUSINESS_ADDRESS'] == '205 DOUGLAS BLVD\nROSEVILLE, CA 95678'
+    assert details['COUNTY'] == 'PLACER'
+    assert details['LICENSE_TYPE_STATUS'] == 'ACTIVE'
+
+def test_missing_field_reads_not_found():
+    fields = dict(license_parser.LICENSE_FIELDS, PHONE=('dt', 'Phone:'))
+    details = license_parser.parse_license_details(saved_page('license_601555.html'), fields)
+    assert details['PHONE'] == 'Not found'
+    assert details['BUSINESS_NAME'] == 'OAK TAVERN & GRILL'
+
+def test_canceled_page_transfer_link():
+    tree = saved_page('license_540210.html')
+    assert license_parser.parse_license_status(tree) == 'CANCELED'
+    number, href = license_parser.parse_transfer_link(tree)
+    assert number == '601555'
+    assert href == '/licensing/license-lookup/single-license/?RPTTYPE=12&LICENSE=601555'
+
+def test_reading_text_leaves_tree_unchanged():
+    tree = saved_page('license_612003.html')
+    before = html.tostring(tree)
+    first = license_parser.parse_license_details(tree)
+    assert license_parser.parse_license_details(tree) == first
+    assert html.tostring(tree) == before
+
+def test_results_table_ranks_exact_city_then_active():
+    tree = saved_page('results_golden_bear.html')
+    assert license_parser.has_results_table(tree) and not license_parser.is_details_page(tree)
+    rows = license_parser.parse_results_table(tree)
+    assert [row['license_number'] for row in rows] == ['612001', '612002', '612003', '598877']
+    assert rows[0]['cells'][2] == '400 VERNON ST\nROSEVILLE LAKES, CA 95678'
+    assert [row['status'] for row in rows] == ['ACTIVE', 'PEND', 'ACTIVE', 'ACTIVE']
+    # ROSEVILLE LAKES only contains the city; of the exact ROSEVILLE rows the ACTIVE one comes first
+    ranked = license_parser.rank_candidates(rows, 'Roseville')
+    assert [row['license_number'] for row in ranked] == ['612003', '612002', '612001']
+
+def test_no_results_page():
+    tree = saved_page('no_results.html')
+    assert license_parser.is_no_results_page(tree)
+    assert not license_parser.has_results_table(tree)
+    assert not license_parser.is_no_results_page(saved_page('results_golden_bear.html'))
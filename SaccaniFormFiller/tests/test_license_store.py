@@ -0,0 +1,105 @@
+import pytest
+
+from license_store import LicenseStore, map_columns
+from lookup_cache import LookupCache
+from scraper import BusinessScraper
+
+CSV_EXPORT = """License Number,DBA Name,Primary Owner,Prem Addr 1,Prem City,Prem Zip,County,License Type Status,Transfer To
+612003,GOLDEN BEAR LLC,"BEAR, GOLDIE",1 MAIN ST,ROSEVILLE,95678,PLACER,Active,
+540210,OAK TAVERN,"OAK, ANN",9 LINCOLN WAY,AUBURN,95603,PLACER,Canceled,601555
+601555,OAK TAVERN & GRILL,"OAK, ANN",9 LINCOLN WAY,AUBURN,95603,PLACER,Active,
+700001,CORNER MARKET,"LEE, AL",2 ELM ST,ROSEVILLE,95678,PLACER,Active,
+700002,CORNER MARKET,"KIM, BO",8 PINE ST,ROSEVILLE,95678,PLACER,Active,
+"""
+
+# Only a full address: city and county come from the ZIP table
+TSV_EXPORT = """license_number\tbusiness_name\tbusiness_address\tstatus
+800001\tRIVER CAFE\t5 RIVER RD, SACRAMENTO, CA 95814\tACTIVE
+"""
+
+@pytest.fixture
+def store(tmp_path):
+    export = tmp_path / 'licenses.csv'
+    export.write_text(CSV_EXPORT, encoding='utf-8')
+    store = LicenseStore(str(tmp_path / 'store.sqlite3'))
+    assert store.ingest(str(export)) == 5
+    yield store
+    store.close()
+
+def test_active_hit_by_name_and_city(store):
+    found = store.find_business('Golden Bear, LLC', 'Roseville')
+    assert found['LICENSE_NUMBER'] == '612003'
+    assert found['BUSINESS_ADDRESS'] == '1 MAIN ST, ROSEVILLE, CA 95678'
+    assert found['COUNTY'] == 'PLACER' and found['LICENSE_TYPE_STATUS'] == 'ACTIVE'
+    assert store.find_business('GOLDEN BEAR', 'AUBURN') is None
+    assert store.stats == {'hits': 1, 'misses': 1, 'stale': 0, 'ambiguous': 0}
+
+def test_canceled_license_follows_its_successor_and_counts_once(store):
+    assert store.find_business('OAK TAVERN', 'AUBURN')['LICENSE_NUMBER'] == '601555'
+    assert store.get_license('540210')['BUSINESS_NAME'] == 'OAK TAVERN & GRILL'
+    assert store.stats == {'hits': 2, 'misses': 0, 'stale': 0, 'ambiguous': 0}
+
+def test_same_name_twice_in_one_city_is_left_to_the_site(store):
+    assert store.find_business('CORNER MARKET', 'ROSEVILLE') is None
+    assert store.get_license('700002')['PRIMARY_OWNER'] == 'KIM, BO'
+    assert store.stats['ambiguous'] == 1
+
+def test_rows_older_than_max_age_are_stale(store):
+    store.max_age = 60
+    store.conn.execute("UPDATE licenses SET imported_at = imported_at - 3600 WHERE license_number = '601555'")
+    assert store.find_business('OAK TAVERN & GRILL', 'AUBURN') is None
+    assert store.get_license('540210') is None  # The transfer ends on the stale row
+    assert store.get_license('612003') is not None
+    assert store.stats == {'hits': 1, 'misses': 0, 'stale': 2, 'ambiguous': 0}
+
+def test_tsv_export_with_a_full_address_column(tmp_path):
+    export = tmp_path / 'licenses.tsv'
+    export.write_text(TSV_EXPORT, encoding='utf-8')
+    store = LicenseStore(str(tmp_path / 'store.sqlite3'))
+    try:
+        assert store.ingest(str(export)) == 1
+        found = store.find_business('RIVER CAFE', 'SACRAMENTO')
+        assert found['LICENSE_NUMBER'] == '800001'
+        assert found['COUNTY'] == 'SACRAMENTO'
+    finally:
+        store.close()
+
+def test_header_without_a_name_column_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="business or owner name"):
+        map_columns(['License Number', 'Premises Address', 'Status'])
+    export = tmp_path / 'licenses.csv'
+    export.write_text("License Number,Status\n612003,ACTIVE\n", encoding='utf-8')
+    store = LicenseStore(str(tmp_path / 'store.sqlite3'))
+    try:
+        with pytest.raises(ValueError):
+            store.ingest(str(export))
+        assert store.count() == 0
+    finally:
+        store.close()
+
+class SiteScraper(BusinessScraper):
+    """Records every search that would have gone to the site."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.queries = []
+
+    def search_and_scrape(self, business_name, city):
+        self.queries.append(business_name)
+        return {'LICENSE_NUMBER': '999999', 'BUSINESS_NAME': business_name}
+
+def test_scraper_asks_the_store_then_the_cache_then_the_site(store, tmp_path):
+    cache = LookupCache(str(tmp_path / 'cache.sqlite3'))
+    cache.put_business('BLUE DOOR', 'ROSEVILLE', {'LICENSE_NUMBER': '123123'})
+    # The cache also has an older answer for a name the store knows; the store wins
+    cache.put_business('GOLDEN BEAR', 'ROSEVILLE', {'LICENSE_NUMBER': '111111'})
+    scraper = SiteScraper(license_store=store, cache=cache)
+    try:
+        assert scraper.lookup_business('GOLDEN BEAR', 'ROSEVILLE')['LICENSE_NUMBER'] == '612003'
+        assert scraper.lookup_business('BLUE DOOR', 'ROSEVILLE')['LICENSE_NUMBER'] == '123123'
+        assert scraper.queries == []
+        assert scraper.lookup_business('RED DOOR', 'ROSEVILLE')['LICENSE_NUMBER'] == '999999'
+        assert scraper.queries == ['RED DOOR']
+        assert cache.get_business('RED DOOR', 'ROSEVILLE') == (True, {'LICENSE_NUMBER': '999999', 'BUSINESS_NAME': 'RED DOOR'})
+    finally:
+        cache.close()
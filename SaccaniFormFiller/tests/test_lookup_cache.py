@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from license_chain import LicenseChainIndex
+from license_index import LicenseMatchIndex
+from lookup_cache import LookupCache
+
+@pytest.fixture
+def stores(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    stores = LookupCache(path), LicenseChainIndex(path), LicenseMatchIndex(path)
+    yield stores
+    for store in stores:
+        store.close()
+
+def test_every_connection_uses_wal(stores):
+    for store in stores:
+        assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+def test_concurrent_writers_on_one_file(stores):
+    cache, chains, names = stores
+    errors = []
+
+    def write(worker):
+        try:
+            for number in range(100):
+                license_number = f"{worker}{number:04d}"
+                cache.put_business(f"STORE {license_number}", 'ROSEVILLE', {'LICENSE_NUMBER': license_number})
+                chains.record_transfer(f"9{license_number}", license_number)
+                names.add(f"STORE {license_number}", 'ROSEVILLE', license_number)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(1, 7)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert cache.get_business('STORE 60099', 'ROSEVILLE') == (True, {'LICENSE_NUMBER': '60099'})
+    assert chains.resolve('960099') == '60099'
+
+def test_negative_results_expire_sooner(tmp_path):
+    cache = LookupCache(str(tmp_path / 'cache.sqlite3'), ttl=3600, negative_ttl=0)
+    cache.put_business('NOWHERE CAFE', 'AUBURN', None)
+    cache.put_business('OAK TAVERN', 'AUBURN', {'LICENSE_NUMBER': '601555'})
+    assert cache.get_business('NOWHERE CAFE', 'AUBURN') == (False, None)
+    assert cache.get_business('oak  tavern', 'Auburn') == (True, {'LICENSE_NUMBER': '601555'})
+    cache.close()
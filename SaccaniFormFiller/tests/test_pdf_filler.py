@@ -0,0 +1,61 @@
+import logging
+import os
+
+import pytest
+from PyPDF2 import PdfReader
+
+from pdf_filler import CombinedOutput, PDFFiller
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'BASE.pdf')
+
+ACCOUNT = {
+    'BUSINESS_NAME': 'AM/PM MINI MARKET',
+    'LICENSE_NUMBER': '123456',
+    'PRIMARY_OWNER': 'DOE, JANE',
+    'STREET': '1 OAK CT',
+    'CITY': 'ROSEVILLE',
+    'STATE': 'CA',
+    'ZIP_CODE': '95678',
+    'Phone Number': '916-555-0100',
+    'ACCOUNT_NUMBER': 'A-42',
+    'New Account': 'Yes',
+}
+
+@pytest.fixture
+def filled_pdf(tmp_path):
+    return PDFFiller().fill_pdf(ACCOUNT, TEMPLATE, str(tmp_path))
+
+def test_filled_form_reads_back_with_overlay_text(filled_pdf, caplog):
+    # strict makes PyPDF2 report xref problems, e.g. "Xref table not zero-indexed", instead of quietly renumbering
+    with caplog.at_level(logging.WARNING):
+        reader = PdfReader(filled_pdf, strict=True)
+        text = reader.pages[0].extract_text()
+    assert len(reader.pages) == 1
+    for value in ('AM/PM MINI MARKET', '123456', 'DOE, JANE', '1 OAK CT', 'ROSEVILLE', '95678', '916', '555', '0100', 'A-42'):
+        assert value in text
+    assert not caplog.records
+
+def test_filled_form_keeps_template(filled_pdf):
+    template = PdfReader(TEMPLATE)
+    filled = PdfReader(filled_pdf)
+    assert filled.pages[0].mediabox == template.pages[0].mediabox
+    assert len(filled.get_fields()) == len(template.get_fields())
+
+def test_slash_in_business_name_stays_in_output_folder(filled_pdf, tmp_path):
+    assert os.path.dirname(filled_pdf).rstrip('/') == str(tmp_path)
+
+def test_combined_output_has_one_filled_page_per_account(tmp_path, caplog):
+    output = CombinedOutput(PDFFiller(), TEMPLATE, str(tmp_path), group_by='Route #')
+    for number, route in enumerate(('7', '7', '9')):
+        output.add(dict(ACCOUNT, LICENSE_NUMBER=f'90000{number}', **{'Route #': route}))
+    paths = output.close()
+
+    with caplog.at_level(logging.WARNING):
+        pages = {os.path.basename(path): [page.extract_text() for page in PdfReader(path, strict=True).pages] for path in paths}
+    assert not caplog.records
+    assert sorted(pages) == ['accounts_7.pdf', 'accounts_9.pdf']
+    for name, license_numbers in (('accounts_7.pdf', ['900000', '900001']), ('accounts_9.pdf', ['900002'])):
+        assert len(pages[name]) == len(license_numbers)
+        for text, license_number in zip(pages[name], license_numbers):
+            assert 'CUSTOMER PROFILE' in text  # the template
+            assert license_number in text and 'ROSEVILLE' in text  # and this account's overlay
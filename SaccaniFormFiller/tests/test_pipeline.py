@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PyPDF2 import PdfReader
+
+import pipeline
+from instrumentation import count
+from pipeline import BatchPipeline
+from scraper_pool import ScraperPool
+
+class FakeFiller:
+    def overlay_content(self, account_data):
+        return b""
+
+    def fill_pdf(self, account_data, template_pdf_path, output_folder):
+        return f"{output_folder}/{account_data['BUSINESS_NAME']}.pdf"
+
+def pool_with(lookup):
+    # A ScraperPool whose lookups never reach a browser
+    pool = ScraperPool(size=2, requests_per_second=0)
+    pool.executor = ThreadPoolExecutor(max_workers=2)
+    pool.scrape_business = lookup
+    return pool
+
+def found(business_name, city):
+    return {'BUSINESS_NAME': business_name, 'BUSINESS_ADDRESS': f"1 MAIN ST, {city}, CA 95678"}
+
+def businesses(*names):
+    return [{'Account #': str(number), 'Client': name, 'City': 'ROSEVILLE'} for number, name in enumerate(names)]
+
+def test_failed_lookup_only_fails_its_own_rows(tmp_path):
+    def lookup(business_name, city):
+        if business_name == 'BROKEN':
+            raise RuntimeError("connection reset")
+        return found(business_name, city)
+
+    events = []
+    BatchPipeline(pool_with(lookup), FakeFiller(), pdf_workers=0).run(
+        businesses('A', 'BROKEN', 'B', 'BROKEN', 'C'), 'unused.pdf', str(tmp_path), {},
+        on_event=lambda kind, index, business, detail: events.append((index, kind, detail)))
+
+    outcomes = {index: (kind, detail) for index, kind, detail in events if kind in ('pdf_written', 'failed')}
+    assert [outcomes[index][0] for index in range(5)] == ['pdf_written', 'failed', 'pdf_written', 'failed', 'pdf_written']
+    assert outcomes[1][1] == outcomes[3][1] == "Scrape failed: connection reset"
+
+def test_run_returns_when_pdf_stage_fails_with_scrape_stage_blocked(tmp_path, monkeypatch):
+    class BrokenExecutor:
+        def __init__(self, **kwargs):
+            pass
+
+        def submit(self, *args):
+            raise RuntimeError("pool broken")
+
+        def shutdown(self, wait=True):
+            pass
+
+    monkeypatch.setattr(pipeline, 'ProcessPoolExecutor', BrokenExecutor)
+    batch = BatchPipeline(pool_with(found), FakeFiller(), pdf_workers=1, queue_size=1)
+    errors = []
+
+    def run():
+        try:
+            batch.run(businesses(*(f"STORE {number}" for number in range(20))), 'unused.pdf', str(tmp_path), {})
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    runner = threading.Thread(target=run, daemon=True)
+    runner.start()
+    runner.join(timeout=10)
+    assert not runner.is_alive()
+    assert errors == ["pool broken"]
+
+def test_pdf_workers_start_while_lookups_record_metrics(tmp_path):
+    def lookup(business_name, city):
+        # Real lookups count every fetch, so scraper threads hold the METRICS lock much of the time
+        end = time.time() + 0.02
+        while time.time() < end:
+            count('http.fetch')
+        return found(business_name, city)
+
+    events = []
+    batch = BatchPipeline(pool_with(lookup), FakeFiller(), pdf_workers=2, journal=False)
+    runner = threading.Thread(target=batch.run, daemon=True, args=(
+        businesses(*(f"STORE {number}" for number in range(20))), 'unused.pdf', str(tmp_path), {},
+        lambda kind, index, business, detail: events.append(kind)))
+    runner.start()
+    runner.join(timeout=60)
+    assert not runner.is_alive()
+    assert events.count('pdf_written') == 20
+
+def test_combined_output_groups_by_the_route_on_each_input_row(tmp_path):
+    from pdf_filler import PDFFiller
+    template = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'BASE.pdf')
+    rows = businesses('A', 'B', 'C')
+    for row, route in zip(rows, ('7', '9', '')):
+        row['Route #'] = route
+    batch = BatchPipeline(pool_with(found), PDFFiller(), output_mode='combined', group_by='Route #', journal=False)
+    batch.run(rows, template, str(tmp_path), {'Route #': '1', 'Salesperson': 'DOE'})
+
+    pages = {os.path.basename(path): len(PdfReader(path).pages) for path in batch.combined_paths}
+    # The row without a route falls back to the batch-wide one
+    assert pages == {'accounts_7.pdf': 1, 'accounts_9.pdf': 1, 'accounts_1.pdf': 1}
+
+def test_combined_output_rejects_acroform_filler():
+    from pdf_filler2 import PDFFiller
+    with pytest.raises(ValueError, match="overlay filler"):
+        BatchPipeline(scraper=None, pdf_filler=PDFFiller(), output_mode='combined')
@@ -0,0 +1,88 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import BatchPipeline
+from run_journal import JOURNAL_NAME, RunJournal, input_fingerprint
+from scraper_pool import ScraperPool
+
+ROWS = [{'Account #': str(number), 'Client': name, 'City': 'ROSEVILLE'} for number, name in enumerate(('A', 'B', 'C'))]
+INFO = {'Route #': '7', 'Salesperson': 'DOE'}
+
+class WritingFiller:
+    def overlay_content(self, account_data):
+        return b""
+
+    def fill_pdf(self, account_data, template_pdf_path, output_folder):
+        path = os.path.join(output_folder, f"{account_data['BUSINESS_NAME']}.pdf")
+        with open(path, 'w') as f:
+            f.write(account_data['Route #'])
+        return path
+
+class CountingPool(ScraperPool):
+    """Lookups answered in memory; `looked_up` lists every name that reached the scraper."""
+
+    def __init__(self):
+        super().__init__(size=2, requests_per_second=0)
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.looked_up = []
+
+    def scrape_business(self, business_name, city):
+        self.looked_up.append(business_name)
+        return {'BUSINESS_NAME': business_name, 'BUSINESS_ADDRESS': f"1 MAIN ST, {city}, CA 95678"}
+
+def run(output_folder, additional_info=INFO, rows=ROWS):
+    pool = CountingPool()
+    events = []
+    batch = BatchPipeline(pool, WritingFiller(), pdf_workers=0, resume=True)
+    batch.run(rows, 'unused.pdf', str(output_folder), additional_info,
+              on_event=lambda kind, index, business, detail: events.append((index, kind)))
+    return pool.looked_up, events
+
+def test_fingerprint_covers_row_and_additional_info():
+    row = {'Account #': '1', 'Client': 'A', 'City': 'ROSEVILLE'}
+    assert input_fingerprint(row, INFO) == input_fingerprint(dict(reversed(list(row.items()))), dict(INFO))
+    assert input_fingerprint(row, INFO) != input_fingerprint(dict(row, City='AUBURN'), INFO)
+    assert input_fingerprint(row, INFO) != input_fingerprint(row, dict(INFO, Salesperson='ROE'))
+
+def test_journal_reloads_and_skips_a_torn_last_line(tmp_path):
+    journal = RunJournal(str(tmp_path))
+    pdf_path = tmp_path / 'A.pdf'
+    pdf_path.write_text('pdf')
+    journal.record('f1', 0, ROWS[0], 'scraped', license_number='612003')
+    journal.record('f1', 0, ROWS[0], 'pdf_written', pdf_path=str(pdf_path))
+    journal.record('f2', 1, ROWS[1], 'no_data', reason="No data found")
+    journal.close()
+    with open(tmp_path / JOURNAL_NAME, 'a', encoding='utf-8') as f:
+        f.write('{"fingerprint": "f3", "sta')
+
+    reloaded = RunJournal(str(tmp_path))
+    try:
+        assert reloaded.is_finished('f1') and not reloaded.is_finished('f2') and not reloaded.is_finished('f3')
+        assert reloaded.summary() == {'pdf_written': 1, 'no_data': 1}
+        assert reloaded.latest['f1']['account'] == '0' and reloaded.latest['f1']['client'] == 'A'
+    finally:
+        reloaded.close()
+
+def test_resume_skips_rows_whose_pdf_exists(tmp_path):
+    looked_up, _ = run(tmp_path)
+    assert sorted(looked_up) == ['A', 'B', 'C']
+
+    looked_up, events = run(tmp_path)
+    assert looked_up == []
+    assert sorted(events) == [(0, 'skipped'), (1, 'skipped'), (2, 'skipped')]
+
+def test_resume_redoes_a_row_whose_pdf_was_deleted(tmp_path):
+    run(tmp_path)
+    os.remove(tmp_path / 'B.pdf')
+
+    looked_up, events = run(tmp_path)
+    assert looked_up == ['B']
+    assert (1, 'pdf_written') in events and (tmp_path / 'B.pdf').exists()
+
+def test_changed_additional_info_makes_every_row_new(tmp_path):
+    run(tmp_path)
+
+    looked_up, events = run(tmp_path, additional_info=dict(INFO, **{'Route #': '9'}))
+    assert sorted(looked_up) == ['A', 'B', 'C']
+    assert not [event for event in events if event[1] == 'skipped']
+    assert (tmp_path / 'A.pdf').read_text() == '9'
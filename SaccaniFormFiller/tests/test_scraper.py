@@ -0,0 +1,47 @@
+from scraper import BusinessScraper
+from scraper_pool import ScraperPool
+from search_strategy import SearchStrategy
+
+class CountingStrategy(SearchStrategy):
+    def __init__(self):
+        super().__init__()
+        self.saves = 0
+
+    def save(self):
+        self.saves += 1
+
+class ScriptedScraper(BusinessScraper):
+    """Answers searches from a dict instead of the site."""
+
+    def __init__(self, answers, **kwargs):
+        super().__init__(**kwargs)
+        self.answers = answers
+        self.queries = []
+
+    def search_and_scrape(self, business_name, city):
+        self.queries.append(business_name)
+        return self.answers.get(business_name)
+
+def test_first_hit_ends_the_search_even_outside_the_city():
+    hit = {'LICENSE_NUMBER': '540210', 'BUSINESS_ADDRESS': '9 LINCOLN WAY\nAUBURN, CA 95603'}
+    scraper = ScriptedScraper({'OAK TAVERN & GRILL': hit})
+    assert scraper.scrape_variations('OAK TAVERN & GRILL', 'ROSEVILLE') == hit
+    assert scraper.queries == ['OAK TAVERN & GRILL']
+
+def test_variations_run_until_a_hit():
+    hit = {'LICENSE_NUMBER': '601555'}
+    scraper = ScriptedScraper({'OAK TAVERN': hit})
+    assert scraper.scrape_variations('OAK TAVERN & GRILL', 'AUBURN') == hit
+    assert scraper.queries[-1] == 'OAK TAVERN' and len(scraper.queries) > 1
+
+def test_pool_saves_search_stats_once():
+    strategy = CountingStrategy()
+    pool = ScraperPool(size=3, requests_per_second=0, search_strategy=strategy)
+    pool.setup_driver()  # HTTP scrapers start Chrome lazily, so nothing is launched here
+    pool.close_driver()
+    assert strategy.saves == 1
+
+def test_standalone_scraper_saves_its_stats():
+    strategy = CountingStrategy()
+    BusinessScraper(search_strategy=strategy).close_driver()
+    assert strategy.saves == 1